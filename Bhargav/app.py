@@ -1,18 +1,29 @@
 import streamlit as st
 import pandas as pd
 import io
+import uuid
 
 from preprocess import (
-    get_word_count,
-    preprocess_text,
-    preprocess_text_with_fallback,
+    CSV_CHUNK_ROWS,
+    pipeline_config,
+    TextDocument,
+    csv_columns,
+    read_csv_rows,
+    preprocess_or_fallback,
+    preprocess_rows,
     extract_text_from_uploaded_file,
     get_top_keywords
 )
 
 from topic_modeling import (
+    CHUNK_SIZE,
+    STREAMING_WORDS,
     split_into_documents,
+    iter_documents,
     train_topic_model,
+    train_streaming_topic_model,
+    auto_topic_model,
+    update_topic_model,
     get_topic_words
 )
 
@@ -22,11 +33,16 @@ from sentiment_summary import (
 )
 
 from reporting import (
-    make_wordcloud_image,
+    make_wordcloud_from_frequencies,
     generate_insights_text,
     make_pdf_bytes
 )
 
+from result_cache import ResultCache
+from jobs import JobManager
+from text_preview import text_preview
+import perf
+
 # ---------- Page Config ----------
 st.set_page_config(page_title="Mind Mesh Analyst", layout="wide")
 
@@ -37,11 +53,155 @@ with open("style.css") as f:
 st.markdown('<h1 class="app-title">Mind Mesh Analyst</h1>', unsafe_allow_html=True)
 st.markdown('<p class="app-caption">Topics · Sentiment · Summary · Insights</p>', unsafe_allow_html=True)
 
+# ---------- Result Cache ----------
+@st.cache_resource
+def get_cache():
+    return ResultCache()
+
+cache = get_cache()
+CONFIG = pipeline_config()
+
+def cached(stage, content, compute, **config):
+    key = cache.key(content, {"stage": stage, **CONFIG, **config})
+    return cache.get_or_compute(key, compute)
+
+# ---------- Analysis Job ----------
+# everything "Run Analysis" shows, computed without Streamlit calls so it can
+# run in the background (jobs.py); progress(stage) is reported between steps
+ANALYSIS_STAGES = ("topics", "sentiment", "summary", "keywords", "report")
+SENTIMENT_PREVIEW_ROWS = 1000  # rows of the sentiment table shown on the page
+SUMMARY_ROWS = 2000  # CSV rows (evenly spaced) the summary is drawn from
+
+@st.cache_resource
+def get_jobs():
+    return JobManager()
+
+jobs = get_jobs()
+
+def run_analysis(doc, algo, n_topics, summary_method, streaming, progress):
+    progress("topics")
+    # streaming mode never holds the chunk list; chunks are generated as needed
+    rows = doc.processed_rows
+    if rows is not None:
+        # CSV rows are the documents
+        docs = [row for row in rows if row]
+    else:
+        docs = None if streaming else split_into_documents(doc.processed)
+
+    sweep_df = None
+    if streaming:
+        model, vectorizer, dtm, features = train_streaming_topic_model(
+            doc.processed, algorithm="NMF" if algo == "NMF" else "LDA", n_topics=5 if n_topics == "auto" else n_topics,
+            documents=docs
+        )
+    elif algo == "LDA (incremental)":
+        # updates the saved model with the new chunks instead of refitting
+        model, vectorizer, dtm, features = update_topic_model(docs, n_topics=5 if n_topics == "auto" else n_topics)
+    elif n_topics == "auto":
+        # fits every K from 2 to 10 at once and keeps the best-scoring model
+        model, vectorizer, dtm, features, sweep_df = auto_topic_model(docs, algorithm=algo)
+    else:
+        model, vectorizer, dtm, features = train_topic_model(
+            docs, algorithm=algo, n_topics=n_topics
+        )
+    topics_df = get_topic_words(model, features)
+
+    progress("sentiment")
+    if rows is not None:
+        # one score per row, next to the row's id
+        sent_df = cached("sentiment", doc.processed, lambda: analyze_sentiments(rows), rows=True)
+        sent_df = pd.concat([pd.DataFrame({"ID": doc.row_ids}), sent_df], axis=1)
+    else:
+        sent_df = cached(
+            "sentiment", doc.processed,
+            lambda: analyze_sentiments(docs if docs is not None else iter_documents(doc.processed)), chunk_size=CHUNK_SIZE
+        )
+
+    progress("summary")
+    if doc.rows is not None and len(doc.rows) > SUMMARY_ROWS:
+        # a sample of the rows: scoring every sentence of a large file buys little
+        summary_text = "\n".join(doc.rows[::-(-len(doc.rows) // SUMMARY_ROWS)])
+    else:
+        summary_text = doc.raw
+    summary = extractive_summary(summary_text, method=summary_method)
+
+    progress("keywords")
+    # one count of the processed words feeds both keywords and word cloud
+    kw_df = get_top_keywords(doc.processed, frequencies=doc.frequencies)
+    wc = make_wordcloud_from_frequencies(doc.frequencies)
+    doc.drop("frequencies")
+
+    progress("report")
+    insights = generate_insights_text(
+        doc.raw_words,
+        doc.processed_words,
+        topics_df,
+        sent_df["compound"].mean(),
+        summary
+    )
+    insights_csv = pd.DataFrame({
+        "Metric": [
+            "Original Word Count",
+            "Processed Word Count",
+            "Average Sentiment",
+            "Summary"
+        ],
+        "Value": [
+            doc.raw_words,
+            doc.processed_words,
+            sent_df["compound"].mean(),
+            summary
+        ]
+    })
+
+    return {
+        "topics_df": topics_df,
+        "sweep_df": sweep_df,
+        "n_topics": model.n_components,
+        "sent_df": sent_df,
+        "summary": summary,
+        "kw_df": kw_df,
+        "wc": wc,
+        "insights": insights,
+        "insights_csv": insights_csv.to_csv(index=False).encode("utf-8"),
+        # built in memory for this session, paginated, with the word cloud
+        "pdf": make_pdf_bytes(insights, images=[wc]).getvalue()
+    }
+
+# progress of a running analysis; reruns the whole page once it finishes
+@st.fragment(run_every=1.0)
+def job_progress(job_id):
+    job = jobs.get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    label = "cancelling…" if job.cancel_requested else (job.stage or job.status)
+    st.progress(job.progress, text=f"⏳ Analysis running: {label} ({job.elapsed:.0f}s)")
+    if st.button("✖ Cancel analysis"):
+        job.cancel()
+
+with st.sidebar.expander("🗄 Result Cache"):
+    st.json(cache.stats())
+
+# ---------- Performance ----------
+# stages record into this run; the panel shows the last run that did any work
+perf_panel = st.sidebar.expander("⏱ Performance")
+if not perf.MEMORY:
+    perf_panel.caption("Peak memory is off (start the server with MMA_PERF_MEMORY=1).")
+recording = perf.start()
+
 # ---------- Session State ----------
-if "raw_text" not in st.session_state:
-    st.session_state.raw_text = ""
-if "processed_text" not in st.session_state:
-    st.session_state.processed_text = ""
+# doc: TextDocument of the current input (raw text + derived views)
+if "doc" not in st.session_state:
+    st.session_state.doc = None
+# background analysis of this session (see jobs.py)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None
+if "shown_job" not in st.session_state:
+    st.session_state.shown_job = None
+if "perf" not in st.session_state:
+    st.session_state.perf = None
 
 # ---------- Input ----------
 st.subheader("📁 Data Import")
@@ -49,107 +209,177 @@ method = st.radio("Input Method", ["File", "Paste Text"], horizontal=True)
 
 if method == "File":
     file = st.file_uploader("Upload file", type=["txt", "csv", "pdf", "docx"])
-    if file:
-        st.session_state.raw_text = extract_text_from_uploaded_file(file)
+    raw_text = None
+    csv_rows = None
+    if file and file.name.endswith(".csv") and st.checkbox("Treat each CSV row as a document"):
+        # only the chosen columns are read
+        columns = csv_columns(file)
+        col_text, col_id = st.columns(2)
+        text_column = col_text.selectbox("Text column", columns)
+        id_column = col_id.selectbox(
+            "ID / timestamp column", [None] + columns,
+            format_func=lambda c: "(row number)" if c is None else c
+        )
+        csv_rows = cached(
+            "csv_rows", file.getvalue(),
+            lambda: read_csv_rows(file, text_column, id_column),
+            text_column=text_column, id_column=id_column
+        )
+        raw_text = "\n".join(csv_rows[1]) or None
+    elif file:
+        raw_text = cached(
+            "extract", file.getvalue(),
+            lambda: extract_text_from_uploaded_file(file),
+            ext=file.name.split(".")[-1], csv_chunk_rows=CSV_CHUNK_ROWS
+        )
 else:
     txt = st.text_area("Paste text here", height=250)
-    if txt:
-        st.session_state.raw_text = txt
+    raw_text = txt or None
+    csv_rows = None
+
+# a new text (or new row ids) starts a new document; the same text keeps its computed views
+if raw_text and (
+    st.session_state.doc is None or st.session_state.doc.raw != raw_text
+    or st.session_state.doc.row_ids != (csv_rows[0] if csv_rows else None)
+):
+    st.session_state.doc = TextDocument.from_rows(*csv_rows) if csv_rows else TextDocument(raw_text)
+    # previews of the previous text start over at page 1
+    for key in [k for k in st.session_state if k.startswith(("raw_", "processed_"))]:
+        del st.session_state[key]
+    # results of the previous text no longer apply
+    if st.session_state.job_id:
+        jobs.cancel(st.session_state.job_id)
+        st.session_state.job_id = None
+doc = st.session_state.doc
 
 # ---------- Raw Preview ----------
-if st.session_state.raw_text:
+if doc is not None:
     st.markdown("### Raw Preview")
-    st.code(st.session_state.raw_text[:800])
-    st.write("Word Count:", get_word_count(st.session_state.raw_text))
+    text_preview(doc.raw, "raw")
+    raw_words = doc.raw_words
+    st.write("Word Count:", raw_words)
 
 # ---------- Preprocessing ----------
-if st.button("⚡ Start Pre-processing"):
-    processed = preprocess_text(st.session_state.raw_text)
-    if not processed.strip():
-        processed = preprocess_text_with_fallback(st.session_state.raw_text)
-    st.session_state.processed_text = processed
+if st.button("⚡ Start Pre-processing") and doc is not None:
+    if doc.rows is not None:
+        doc.processed_rows = cached("preprocess_rows", doc.raw, lambda: preprocess_rows(doc.rows))
+    else:
+        doc.processed = cached("preprocess", doc.raw, lambda: preprocess_or_fallback(doc.raw))
     st.success("Preprocessing completed")
 
 # ---------- Analysis ----------
-if st.session_state.processed_text:
+if doc is not None and doc.is_processed and doc.processed:
     st.subheader("📊 Analysis Dashboard")
 
+    processed_words = doc.processed_words
+
     col1, col2 = st.columns(2)
-    col1.metric("Original Words", get_word_count(st.session_state.raw_text))
-    col2.metric("Processed Words", get_word_count(st.session_state.processed_text))
+    col1.metric("Original Words", raw_words)
+    col2.metric("Processed Words", processed_words)
+    with st.expander("Processed Text"):
+        text_preview(doc.processed, "processed")
 
-    algo = st.selectbox("Topic Algorithm", ["LDA", "NMF"])
-    n_topics = st.slider("Number of Topics", 2, 10, 5)
+    algo = st.selectbox("Topic Algorithm", ["LDA", "NMF", "LDA (incremental)"])
+    n_topics = st.select_slider("Number of Topics", options=["auto"] + list(range(2, 11)), value=5)
+    summary_method = st.selectbox("Summary Method", ["tfidf", "textrank", "frequency", "lead"])
+    streaming = st.checkbox(
+        "Streaming mode (bounded memory for very large texts)",
+        value=processed_words >= STREAMING_WORDS,
+        help="Hashes the text in batches instead of building a vocabulary. The number of topics is fixed (5 for auto)."
+    )
 
     if st.button("🔍 Run Analysis"):
-        docs = split_into_documents(st.session_state.processed_text)
-
-        model, vectorizer, dtm, features = train_topic_model(
-            docs, algorithm=algo, n_topics=n_topics
+        # runs as a background job: reruns (any widget change) reattach to it
+        # the job works on a copy: it computes and drops views while reruns read doc
+        job = jobs.submit(
+            st.session_state.session_id, "analysis", run_analysis,
+            doc.copy(), algo, n_topics, summary_method, streaming, stages=ANALYSIS_STAGES
         )
+        st.session_state.job_id = job.id
+
+    job = jobs.get(st.session_state.job_id) if st.session_state.job_id else None
+    if job is not None and not job.done:
+        job_progress(job.id)
+    elif job is not None and job.status == "failed":
+        st.error(f"Analysis failed: {job.error}")
+    elif job is not None and job.status == "cancelled":
+        st.info("Analysis cancelled.")
+    elif job is not None:
+        result = job.result
+        if st.session_state.shown_job != job.id:
+            # first run showing this job: its stage timings go to the panel
+            st.session_state.shown_job = job.id
+            if job.recording is not None and job.recording.spans:
+                st.session_state.perf = job.recording
+                perf.export(job.recording)
 
         # ---------- Topics ----------
-        topics_df = get_topic_words(model, features)
         st.subheader("🧠 Topics")
-        st.dataframe(topics_df)
+        if result["sweep_df"] is not None:
+            st.caption(f"Auto-selected {result['n_topics']} topics")
+            with st.expander("Topic count sweep"):
+                st.dataframe(result["sweep_df"], hide_index=True)
+        st.dataframe(result["topics_df"])
 
         # ---------- Sentiment ----------
         st.subheader("😊 Sentiment Analysis")
-        sent_df = analyze_sentiments(docs)
-        st.dataframe(sent_df)
+        sent_df = result["sent_df"]
+        st.dataframe(sent_df.head(SENTIMENT_PREVIEW_ROWS))
+        if len(sent_df) > SENTIMENT_PREVIEW_ROWS:
+            st.caption(f"First {SENTIMENT_PREVIEW_ROWS:,} of {len(sent_df):,} rows")
+            # built only when clicked
+            st.download_button(
+                label="📊 Download Sentiment (CSV)",
+                data=lambda: sent_df.to_csv(index=False).encode("utf-8"),
+                file_name="sentiment.csv",
+                mime="text/csv"
+            )
 
         # ---------- Summary ----------
         st.subheader("📝 Summary")
-        summary = extractive_summary(st.session_state.raw_text)
-        st.write(summary)
+        st.write(result["summary"])
 
         # ---------- Keywords ----------
         st.subheader("🔑 Top Keywords")
-        kw_df = get_top_keywords(st.session_state.processed_text)
-        st.dataframe(kw_df)
+        st.dataframe(result["kw_df"])
 
         # ---------- Word Cloud ----------
         st.subheader("☁ Word Cloud")
-        wc = make_wordcloud_image(st.session_state.processed_text.split())
-        st.image(wc)
-
-        # ---------- Insights ----------
-        insights = generate_insights_text(
-            get_word_count(st.session_state.raw_text),
-            get_word_count(st.session_state.processed_text),
-            topics_df,
-            sent_df["compound"].mean(),
-            summary
-        )
+        st.image(result["wc"])
 
         # ---------- Downloads ----------
         st.subheader("📥 Download Reports")
 
         st.download_button(
             label="📄 Download Insights (TXT)",
-            data=insights.encode("utf-8"),
+            data=result["insights"].encode("utf-8"),
             file_name="insights.txt",
             mime="text/plain"
         )
 
-        insights_csv = pd.DataFrame({
-            "Metric": [
-                "Original Word Count",
-                "Processed Word Count",
-                "Average Sentiment",
-                "Summary"
-            ],
-            "Value": [
-                get_word_count(st.session_state.raw_text),
-                get_word_count(st.session_state.processed_text),
-                sent_df["compound"].mean(),
-                summary
-            ]
-        })
-
         st.download_button(
             label="📊 Download Insights (CSV)",
-            data=insights_csv.to_csv(index=False).encode("utf-8"),
+            data=result["insights_csv"],
             file_name="insights.csv",
             mime="text/csv"
-        )
\ No newline at end of file
+        )
+
+        st.download_button(
+            label="📑 Download Insights (PDF)",
+            data=result["pdf"],
+            file_name="insights.pdf",
+            mime="application/pdf"
+        )
+
+# ---------- Performance Panel ----------
+perf.stop()
+if recording.spans:
+    st.session_state.perf = recording
+    perf.export(recording)
+
+if st.session_state.perf is not None:
+    with perf_panel:
+        st.dataframe(pd.DataFrame(perf.summary(st.session_state.perf.spans)), hide_index=True)
+        col_json, col_prom = st.columns(2)
+        col_json.download_button("JSON", perf.to_json(st.session_state.perf), file_name="perf.json", mime="application/json")
+        col_prom.download_button("Prometheus", perf.to_prometheus(st.session_state.perf), file_name="perf.prom", mime="text/plain")
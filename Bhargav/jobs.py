@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import perf
+
+# ---------- Background jobs ----------
+# The analysis runs on a small thread pool owned by the server process, not in
+# the Streamlit script thread, so widget changes (reruns) no longer abort it.
+# The session keeps the job id; a rerun looks the job up and shows its
+# progress or result. Cancelling is cooperative: the job stops at its next
+# progress report.
+
+JOB_THREADS = int(os.environ.get("MMA_JOB_THREADS", "2"))
+JOB_TTL_SECONDS = int(os.environ.get("MMA_JOB_TTL", "3600"))  # finished jobs are dropped after this
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, session_id, name, stages):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.name = name
+        self.stages = list(stages)
+        self.status = "queued"  # queued -> running -> done / failed / cancelled
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.recording = None  # perf spans of the job
+        self.submitted = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+
+    # called from the job with the current stage and how much of it is done
+    # (0-1); raises JobCancelled once cancel() has been requested
+    def report(self, stage, fraction=0.0):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.stage = stage
+        index = self.stages.index(stage) if stage in self.stages else 0
+        self.progress = min((index + fraction) / max(len(self.stages), 1), 1.0)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.submitted
+
+# job table of the server process, shared by all sessions
+class JobManager:
+    def __init__(self, threads=JOB_THREADS, ttl=JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="mma-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # runs fn(*args, progress=job.report, **kwargs) in the background; a
+    # still-running job of the same session and name is cancelled and
+    # finished ones are dropped (superseded)
+    def submit(self, session_id, name, fn, *args, stages=(), **kwargs):
+        job = Job(session_id, name, stages)
+        with self._lock:
+            self._prune()
+            for other in list(self._jobs.values()):
+                if other.session_id == session_id and other.name == name:
+                    if other.done:
+                        del self._jobs[other.id]
+                    else:
+                        other.cancel()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished = time.time()
+            return
+        job.status = "running"
+        job.recording = perf.start()
+        status = "failed"
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.progress = 1.0
+            status = "done"
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            perf.stop()
+            job.finished = time.time()
+            # the final status is published last, once the recording and finish time are set
+            job.status = status
+
+    def _prune(self):
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job.done and job.finished and now - job.finished > self.ttl:
+                del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, session_id):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+
+# Per-stage timing and memory instrumentation.
+# Stages are wrapped with @timed("name") or `with span("name")`. Nothing is
+# measured unless a recording was started in the current thread (start()),
+# so code running outside the UI pays one thread-local lookup per call.
+# MMA_PERF=0 turns recording off entirely. Peak memory (tracemalloc) is
+# opt-in with MMA_PERF_MEMORY=1 because it slows allocation-heavy stages down
+# several times. Tracing is process-wide, so it is switched on once at start-up
+# for every session, never per run; concurrent runs share the peak counter.
+
+ENABLED = os.environ.get("MMA_PERF", "1") != "0"
+MEMORY = ENABLED and os.environ.get("MMA_PERF_MEMORY", "0") == "1"
+EXPORT_DIR = os.environ.get("MMA_PERF_DIR")   # write perf.json / perf.prom here after each run
+METRIC_PREFIX = "mindmesh_stage"
+MB = 1024 * 1024
+
+_local = threading.local()
+_NOOP = nullcontext()
+
+if MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# spans finished while this recording was active, in completion order
+class Recording:
+
+    def __init__(self):
+        self.started = time.time()
+        self.spans = []
+
+
+# start recording spans in this thread (one Streamlit script run)
+def start():
+    recording = Recording()
+    if ENABLED:
+        _local.recording = recording
+        _local.stack = []
+    return recording
+
+
+def stop():
+    _local.recording = None
+    _local.stack = []
+
+
+def current():
+    return getattr(_local, "recording", None)
+
+
+class _Span:
+
+    __slots__ = ("name", "frame")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _local.stack
+        path = f"{stack[-1][0]}/{self.name}" if stack else self.name
+        start_bytes = 0
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_bytes, peak = tracemalloc.get_traced_memory()
+            # the peak is global: hand the parent what it has seen so far before resetting it
+            if stack:
+                stack[-1][4] = max(stack[-1][4], peak)
+            tracemalloc.reset_peak()
+        self.frame = [path, time.perf_counter(), time.thread_time(), start_bytes, 0, tracing]
+        stack.append(self.frame)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.frame[1]
+        cpu = time.thread_time() - self.frame[2]
+        recording = current()
+        if recording is None:
+            return False
+        stack = _local.stack
+        if stack and stack[-1] is self.frame:
+            stack.pop()
+
+        path, _, _, start_bytes, child_peak, tracing = self.frame
+        record = {
+            "path": path,
+            "name": self.name,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_mb": None
+        }
+        if tracing and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+            record["peak_mb"] = round((peak - start_bytes) / MB, 3)
+            if stack:
+                stack[-1][4] = max(stack[-1][4], peak)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        recording.spans.append(record)
+        return False
+
+
+def span(name):
+    if current() is None:
+        return _NOOP
+    return _Span(name)
+
+
+# decorator: record every call of the function as a span
+def timed(name=None):
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------- Export ----------
+
+# spans aggregated by path (first-seen order); self_seconds is wall time
+# not spent in child spans
+def summary(spans):
+    rows = {}
+    for s in spans:
+        row = rows.setdefault(s["path"], {
+            "stage": s["path"], "calls": 0, "wall_seconds": 0.0,
+            "self_seconds": 0.0, "cpu_seconds": 0.0, "peak_mb": None, "errors": 0
+        })
+        row["calls"] += 1
+        row["wall_seconds"] += s["wall_seconds"]
+        row["self_seconds"] += s["wall_seconds"]
+        row["cpu_seconds"] += s["cpu_seconds"]
+        row["errors"] += "error" in s
+        if s["peak_mb"] is not None:
+            row["peak_mb"] = max(row["peak_mb"] or 0, s["peak_mb"])
+
+    for path, row in rows.items():
+        parent = path.rpartition("/")[0]
+        if parent in rows:
+            rows[parent]["self_seconds"] -= row["wall_seconds"]
+
+    for row in rows.values():
+        for k in ("wall_seconds", "self_seconds", "cpu_seconds"):
+            row[k] = round(max(row[k], 0.0), 6)
+    return list(rows.values())
+
+
+def to_json(recording):
+    return json.dumps({
+        "started": recording.started,
+        "stages": summary(recording.spans),
+        "spans": recording.spans
+    }, indent=2)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# Prometheus text exposition format (e.g. for node_exporter's textfile collector)
+def to_prometheus(recording, prefix=METRIC_PREFIX):
+    metrics = [
+        ("calls_total", "counter", "Number of calls", "calls"),
+        ("wall_seconds_total", "counter", "Wall-clock time", "wall_seconds"),
+        ("self_seconds_total", "counter", "Wall-clock time outside child stages", "self_seconds"),
+        ("cpu_seconds_total", "counter", "CPU time of the calling thread", "cpu_seconds"),
+        ("errors_total", "counter", "Calls that raised", "errors"),
+        ("peak_bytes", "gauge", "Peak traced memory above the stage's starting point", "peak_mb")
+    ]
+    rows = summary(recording.spans)
+    lines = []
+    for suffix, kind, help_text, key in metrics:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {help_text} per pipeline stage.")
+        lines.append(f"# TYPE {name} {kind}")
+        for row in rows:
+            value = row[key]
+            if value is None:
+                continue
+            if key == "peak_mb":
+                value = int(value * MB)
+            lines.append(f'{name}{{stage="{_label(row["stage"])}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+# writes perf.json and perf.prom to directory (atomically), returns the paths
+def export(recording, directory=EXPORT_DIR):
+    if not directory:
+        return []
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, text in (("perf.json", to_json(recording)), ("perf.prom", to_prometheus(recording))):
+        path = os.path.join(directory, filename)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
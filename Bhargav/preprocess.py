@@ -1,8 +1,9 @@
 import re
+import codecs
+import hashlib
 import pandas as pd
 from collections import Counter
-from pypdf import PdfReader
-from docx import Document
+import perf
 
 STOPWORDS = set("""
 a about above after again against all am an and any are as at be because been
@@ -14,34 +15,228 @@ theirs them themselves then there these they this those through to too under
 until up very was we were what when where which while who why with would you your
 """.split())
 
+CSV_CHUNK_ROWS = 5000
+CSV_BLOCK_BYTES = 4 * 1024 * 1024  # bytes parsed per pyarrow block (CSV rows as documents)
+TXT_CHUNK_BYTES = 1024 * 1024
+
+# settings that change preprocess_text output (part of the cache key)
+def pipeline_config():
+    return {
+        "stopwords": hashlib.sha1(" ".join(sorted(STOPWORDS)).encode("utf-8")).hexdigest(),
+        "min_token_len": 2
+    }
+
 def get_word_count(text):
     return len(text.split())
 
-def preprocess_text(text):
+def _clean(text):
     text = text.lower()
     text = re.sub(r"[^a-z\s]", " ", text)
     tokens = [t for t in text.split() if t not in STOPWORDS and len(t) > 1]
     return " ".join(tokens)
 
+@perf.timed()
+def preprocess_text(text):
+    return _clean(text)
+
+# preprocess_text of every row, timed as one span ("" for rows with nothing left)
+@perf.timed("preprocess_text")
+def preprocess_rows(rows):
+    return [_clean(row) for row in rows]
+
 def preprocess_text_with_fallback(text):
     text = re.sub(r"[^a-z0-9\s]", " ", text.lower())
     return " ".join(text.split())
 
-def extract_text_from_uploaded_file(f):
+# preprocess_text, or the fallback when nothing but stopwords/digits is left
+def preprocess_or_fallback(text):
+    processed = preprocess_text(text)
+    if not processed.strip():
+        processed = preprocess_text_with_fallback(text)
+    return processed
+
+# ---------- Document ----------
+# The raw text plus the views derived from it (processed text, word counts,
+# term frequencies). Each view is computed at most once and kept with the
+# document in the session, so reruns do not recount or rehash the text.
+# drop() frees a view once it has been used.
+# A CSV read with one document per row (from_rows) also keeps the row texts
+# and ids; its processed text is the processed rows, one per line.
+class TextDocument:
+    __slots__ = ("raw", "_processed", "_raw_words", "_processed_words", "_frequencies", "rows", "row_ids", "_processed_rows")
+
+    def __init__(self, raw, processed=None):
+        self.raw = raw
+        self._processed = processed
+        self._raw_words = None
+        self._processed_words = None
+        self._frequencies = None
+        self.rows = None
+        self.row_ids = None
+        self._processed_rows = None
+
+    @classmethod
+    def from_rows(cls, row_ids, rows):
+        doc = cls("\n".join(rows))
+        doc.rows = rows
+        doc.row_ids = row_ids
+        return doc
+
+    @property
+    def raw_words(self):
+        if self._raw_words is None:
+            self._raw_words = get_word_count(self.raw)
+        return self._raw_words
+
+    @property
+    def is_processed(self):
+        return self._processed is not None
+
+    @property
+    def processed(self):
+        if self._processed is None:
+            self._processed = preprocess_or_fallback(self.raw)
+        return self._processed
+
+    # set from the result cache instead of preprocessing again
+    @processed.setter
+    def processed(self, text):
+        self._processed = text
+        self._processed_words = None
+        self._frequencies = None
+
+    # None unless the document was built from CSV rows
+    @property
+    def processed_rows(self):
+        if self._processed_rows is None and self.rows is not None:
+            self.processed_rows = preprocess_rows(self.rows)
+        return self._processed_rows
+
+    # set from the result cache instead of preprocessing again
+    @processed_rows.setter
+    def processed_rows(self, rows):
+        self._processed_rows = rows
+        self.processed = "\n".join(rows)
+
+    @property
+    def processed_words(self):
+        if self._processed_words is None:
+            self._processed_words = get_word_count(self.processed)
+        return self._processed_words
+
+    @property
+    def frequencies(self):
+        if self._frequencies is None:
+            self._frequencies = get_term_frequencies(self.processed)
+        return self._frequencies
+
+    # the same text and views in a new object: a background job fills and
+    # drops views on its copy, never on the document the session is showing
+    def copy(self):
+        other = TextDocument.__new__(TextDocument)
+        for slot in self.__slots__:
+            setattr(other, slot, getattr(self, slot))
+        return other
+
+    def drop(self, *views):
+        # "frequencies" only: raw and processed text back every other view
+        for view in views:
+            if view != "frequencies":
+                raise ValueError(f"Unknown document view: {view}")
+            self._frequencies = None
+
+# Streaming extraction: pieces are pages (pdf), paragraphs (docx), row chunks
+# (csv) or 1 MB blocks (txt). "".join(pieces) is the full text and every piece
+# boundary is whitespace.
+def iter_text_from_uploaded_file(f, chunk_rows=CSV_CHUNK_ROWS):
     ext = f.name.split(".")[-1]
     if ext == "txt":
-        return f.read().decode("utf-8")
-    if ext == "csv":
-        df = pd.read_csv(f)
-        return " ".join(df.astype(str).values.flatten())
-    if ext == "pdf":
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        carry = ""
+        while True:
+            block = f.read(TXT_CHUNK_BYTES)
+            text = carry + decoder.decode(block, final=not block)
+            if not block:
+                break
+            cut = max(text.rfind(" "), text.rfind("\n"))
+            if cut <= 0:
+                carry = text
+                continue
+            carry = text[cut:]
+            yield text[:cut]
+        if text:
+            yield text
+    elif ext == "csv":
+        for i, df in enumerate(pd.read_csv(f, chunksize=chunk_rows)):
+            if not df.empty:
+                yield (" " if i else "") + " ".join(df.astype(str).values.flatten())
+    elif ext == "pdf":
+        from pypdf import PdfReader
         reader = PdfReader(f)
-        return " ".join(p.extract_text() or "" for p in reader.pages)
-    if ext == "docx":
+        for i, p in enumerate(reader.pages):
+            yield (" " if i else "") + (p.extract_text() or "")
+    elif ext == "docx":
+        from docx import Document
         doc = Document(f)
-        return " ".join(p.text for p in doc.paragraphs)
-    return ""
+        for i, p in enumerate(doc.paragraphs):
+            yield (" " if i else "") + p.text
+
+@perf.timed("extract_text")
+def extract_text_from_uploaded_file(f):
+    return "".join(iter_text_from_uploaded_file(f))
+
+# ---------- CSV rows as documents ----------
+# Instead of flattening the whole table into one text, each row's text column
+# is one document. Only the chosen columns are parsed, as strings, with
+# pyarrow's streaming reader when installed (pandas chunks otherwise).
+
+# column names of a CSV file (only the header is parsed)
+def csv_columns(f):
+    f.seek(0)
+    columns = [str(c) for c in pd.read_csv(f, nrows=0).columns]
+    f.seek(0)
+    return columns
+
+# yields {column: list of str} per block of rows; empty cells are ""
+def _csv_column_chunks(f, columns):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+    except ImportError:
+        f.seek(0)
+        for df in pd.read_csv(f, usecols=columns, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_ROWS):
+            yield {c: df[c].tolist() for c in columns}
+        return
+    reader = pv.open_csv(
+        pa.BufferReader(f.getvalue()),
+        read_options=pv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        parse_options=pv.ParseOptions(newlines_in_values=True),  # free-text answers span lines
+        convert_options=pv.ConvertOptions(include_columns=columns, column_types={c: pa.string() for c in columns})
+    )
+    for batch in reader:
+        yield {c: batch.column(c).to_pylist() for c in columns}
+
+# (ids, texts) of every row with a non-empty text; ids come from id_column
+# (e.g. a response id or timestamp) or are the 1-based row numbers
+@perf.timed("extract_text")
+def read_csv_rows(f, text_column, id_column=None):
+    columns = [text_column] + ([id_column] if id_column and id_column != text_column else [])
+    ids, texts = [], []
+    row = 0
+    for chunk in _csv_column_chunks(f, columns):
+        chunk_texts = chunk[text_column]
+        chunk_ids = chunk[id_column] if id_column else range(row + 1, row + len(chunk_texts) + 1)
+        row += len(chunk_texts)
+        for row_id, text in zip(chunk_ids, chunk_texts):
+            if text and not text.isspace():
+                ids.append(row_id)
+                texts.append(text)
+    return ids, texts
+
+def get_term_frequencies(text):
+    return Counter(text.split())
 
-def get_top_keywords(text, n=10):
-    counter = Counter(text.split())
+# pass frequencies from get_term_frequencies to reuse counts already made
+def get_top_keywords(text, n=10, frequencies=None):
+    counter = frequencies if frequencies is not None else get_term_frequencies(text)
     return pd.DataFrame(counter.most_common(n), columns=["Keyword", "Frequency"])
\ No newline at end of file
@@ -1,14 +1,54 @@
-from wordcloud import WordCloud
+import hashlib
 import io
-from reportlab.pdfgen import canvas
+import threading
+from collections import Counter, OrderedDict
+import perf
 
-def make_wordcloud_image(words):
-    wc = WordCloud(width=600, height=300, background_color="white")
-    img = wc.generate(" ".join(words))
+# wordcloud and reportlab are imported on first use to keep app start-up fast
+
+# ---------- Word Cloud ----------
+# Drawn from term frequencies (no re-tokenizing) straight to PNG bytes.
+# PNGs are kept in a small LRU cache keyed by a hash of the words drawn.
+
+WORDCLOUD_MAX_WORDS = 200
+WORDCLOUD_CACHE_SIZE = 32
+
+_png_cache = OrderedDict()
+_png_lock = threading.Lock()
+
+def frequency_key(top):
+    h = hashlib.sha1()
+    for word, count in top:
+        h.update(f"{word}\0{count}\0".encode("utf-8"))
+    return h.hexdigest()
+
+@perf.timed("wordcloud")
+def make_wordcloud_from_frequencies(frequencies, width=600, height=300):
+    # only the top words are drawn, so only they go into the key
+    top = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:WORDCLOUD_MAX_WORDS]
+    key = (frequency_key(top), width, height)
+    with _png_lock:
+        if key in _png_cache:
+            _png_cache.move_to_end(key)
+            return _png_cache[key]
+
+    from wordcloud import WordCloud
+    wc = WordCloud(width=width, height=height, background_color="white", max_words=WORDCLOUD_MAX_WORDS)
+    img = wc.generate_from_frequencies(dict(top))
     buf = io.BytesIO()
     img.to_image().save(buf, format="PNG")
-    return buf.getvalue()
+    png = buf.getvalue()
+
+    with _png_lock:
+        _png_cache[key] = png
+        while len(_png_cache) > WORDCLOUD_CACHE_SIZE:
+            _png_cache.popitem(last=False)
+    return png
 
+def make_wordcloud_image(words):
+    return make_wordcloud_from_frequencies(Counter(words))
+
+@perf.timed()
 def generate_insights_text(raw_count, processed_count, topics_df, sentiment, summary):
     return f"""
 TEXT ANALYSIS REPORT
@@ -25,11 +65,46 @@ Summary:
 {summary}
 """
 
-def make_pdf_bytes(text):
+# ---------- PDF ----------
+# Lines are wrapped to the page width and a new page is started when the
+# current one is full; the text is capped so huge reports stay bounded.
+
+PDF_MARGIN = 40
+PDF_LEADING = 14
+PDF_MAX_CHARS = 200000
+
+@perf.timed()
+def make_pdf_bytes(text, images=()):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader, simpleSplit
+    from reportlab.pdfgen import canvas
+    width, height = A4
     buf = io.BytesIO()
-    c = canvas.Canvas(buf)
-    for i, line in enumerate(text.split("\n")):
-        c.drawString(40, 800 - i*14, line)
+    c = canvas.Canvas(buf, pagesize=A4)
+    y = height - PDF_MARGIN
+
+    def make_room(needed):
+        nonlocal y
+        if y - needed < PDF_MARGIN:
+            c.showPage()
+            y = height - PDF_MARGIN
+
+    for paragraph in text[:PDF_MAX_CHARS].split("\n"):
+        for line in simpleSplit(paragraph, "Helvetica", 10, width - 2 * PDF_MARGIN) or [""]:
+            make_room(PDF_LEADING)
+            c.setFont("Helvetica", 10)
+            c.drawString(PDF_MARGIN, y - 10, line)
+            y -= PDF_LEADING
+
+    # images (PNG bytes, e.g. the word cloud) follow the text, scaled to fit
+    for png in images:
+        img = ImageReader(io.BytesIO(png))
+        w, h = img.getSize()
+        scale = min((width - 2 * PDF_MARGIN) / w, (height - 2 * PDF_MARGIN) / h, 1)
+        make_room(h * scale + 10)
+        c.drawImage(img, PDF_MARGIN, y - h * scale, w * scale, h * scale)
+        y -= h * scale + 10
+
     c.save()
     buf.seek(0)
     return buf
\ No newline at end of file
@@ -1,19 +1,137 @@
-import nltk
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.tokenize import sent_tokenize
+import perf
 
-nltk.download("vader_lexicon")
-nltk.download("punkt")
+# NLTK data is looked up locally only (air-gapped installs); set
+# MMA_NLTK_DOWNLOAD=1 to let missing resources be downloaded
+NLTK_RESOURCES = {
+    "vader_lexicon": ["sentiment/vader_lexicon.zip"],
+    "punkt": ["tokenizers/punkt_tab/english/", "tokenizers/punkt/english.pickle"]
+}
 
-def analyze_sentiments(docs):
-    sia = SentimentIntensityAnalyzer()
-    data = []
-    for d in docs:
-        score = sia.polarity_scores(d)
-        data.append(score)
-    return pd.DataFrame(data)
+def require_nltk(name):
+    import nltk
+    for path in NLTK_RESOURCES[name]:
+        try:
+            nltk.data.find(path)
+            return
+        except LookupError:
+            pass
+    if os.environ.get("MMA_NLTK_DOWNLOAD") == "1":
+        nltk.download("punkt_tab" if name == "punkt" else name, quiet=True)
+        return
+    raise LookupError(f"NLTK data '{name}' not found locally. Run `python -m nltk.downloader {name}` or set NLTK_DATA.")
 
-def extractive_summary(text, max_sentences=5):
+MIN_DOCS_PER_WORKER = 2000
+
+# one analyzer per process: building it re-parses the whole VADER lexicon
+_sia = None
+
+def get_analyzer():
+    global _sia
+    if _sia is None:
+        require_nltk("vader_lexicon")
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+def _score_block(docs):
+    sia = get_analyzer()
+    scores = np.empty((len(docs), 4), dtype=np.float64)
+    for i, d in enumerate(docs):
+        s = sia.polarity_scores(d)
+        scores[i] = (s["neg"], s["neu"], s["pos"], s["compound"])
+    return scores
+
+# columnar batch scoring: neg/neu/pos/compound float arrays + label codes
+# (1 positive, 0 neutral, -1 negative); big batches can use several processes
+def score_sentiments(docs, workers=1):
+    docs = list(docs)
+    workers = min(workers, len(docs) // MIN_DOCS_PER_WORKER)
+    if workers > 1:
+        size = -(-len(docs) // workers)
+        blocks = [docs[i:i + size] for i in range(0, len(docs), size)]
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            scores = np.concatenate(list(pool.map(_score_block, blocks)))
+    else:
+        scores = _score_block(docs)
+    compound = scores[:, 3]
+    return {
+        "neg": scores[:, 0],
+        "neu": scores[:, 1],
+        "pos": scores[:, 2],
+        "compound": compound,
+        "label": np.where(compound >= 0.05, 1, np.where(compound <= -0.05, -1, 0)).astype(np.int8)
+    }
+
+@perf.timed()
+def analyze_sentiments(docs, workers=1):
+    cols = score_sentiments(docs, workers)
+    return pd.DataFrame({k: cols[k] for k in ("neg", "neu", "pos", "compound")})
+
+# ---------- Extractive summary ----------
+# Sentences are scored on one sparse sentence x term matrix:
+#   lead      - first sentences (old behaviour)
+#   frequency - sum of corpus frequencies of the sentence's words
+#   tfidf     - cosine of the sentence's tf-idf vector with the document centroid
+#   textrank  - PageRank over the cosine-similarity graph; W @ v is computed as
+#               X @ (X.T @ v) so the n x n graph is never materialised
+
+def sentence_matrix(sentences, tfidf=True):
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+    vectorizer = CountVectorizer(token_pattern=r"(?u)\b\w+\b", stop_words="english" if tfidf else None, dtype=np.float32)
+    counts = vectorizer.fit_transform(sentences)
+    return TfidfTransformer().fit_transform(counts) if tfidf else counts
+
+def textrank_scores(X, damping=0.85, max_iter=100, tol=1e-6):
+    n = X.shape[0]
+    XT = X.T.tocsr()
+    diag = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+    graph_dot = lambda v: X @ (XT @ v) - diag * v
+    out = graph_dot(np.ones(n))
+    dangling = out <= 1e-12
+    out[dangling] = 1
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        updated = graph_dot(scores / out)
+        updated[dangling] = 0
+        updated = (1 - damping) / n + damping * (updated + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def score_sentences(sentences, method="tfidf"):
+    if method == "lead":
+        return -np.arange(len(sentences), dtype=np.float64)
+    try:
+        X = sentence_matrix(sentences, tfidf=method != "frequency")
+    except ValueError:
+        return np.zeros(len(sentences))
+    if method == "frequency":
+        return X @ np.asarray(X.sum(axis=0)).ravel()
+    if method == "tfidf":
+        return X @ np.asarray(X.mean(axis=0)).ravel()
+    if method == "textrank":
+        return textrank_scores(X)
+    raise ValueError(f"Unknown summary method: {method}")
+
+@perf.timed()
+def extractive_summary(text, max_sentences=5, method="tfidf"):
+    require_nltk("punkt")
+    from nltk.tokenize import sent_tokenize
     sentences = sent_tokenize(text)
-    return " ".join(sentences[:max_sentences])
\ No newline at end of file
+    scores = score_sentences(sentences, method)
+    chosen, seen = [], set()
+    for i in np.argsort(-scores, kind="stable"):
+        if sentences[i] not in seen:
+            seen.add(sentences[i])
+            chosen.append(i)
+            if len(chosen) == max_sentences:
+                break
+    # keep the original sentence order
+    return " ".join(sentences[i] for i in sorted(chosen))
\ No newline at end of file
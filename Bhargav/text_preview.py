@@ -0,0 +1,89 @@
+import itertools
+import re
+import streamlit as st
+
+# ---------- Text preview ----------
+# Texts are shown one page (PAGE_CHARS characters) at a time. The page is cut
+# out of the text on the server, so a rerun sends one page however large the
+# text is. Navigation (page, character offset, search matches) reruns only
+# the preview fragment, not the whole app.
+
+PAGE_CHARS = 5000
+MAX_MATCHES = 1000
+_SNAP = 50  # a page boundary moves at most this far to reach whitespace
+_SPACE = re.compile(r"\s")
+
+def page_count(text, page_chars=PAGE_CHARS):
+    return max(1, -(-len(text) // page_chars))
+
+# offset where page (0-based) begins: page * page_chars, moved to the next
+# whitespace when there is one within _SNAP characters, so words stay whole
+def page_start(text, page, page_chars=PAGE_CHARS):
+    offset = min(page * page_chars, len(text))
+    if offset in (0, len(text)):
+        return offset
+    match = _SPACE.search(text, offset, offset + _SNAP)
+    return match.end() if match else offset
+
+# 0-based page containing the character offset
+def page_of(text, offset, page_chars=PAGE_CHARS):
+    page = min(offset // page_chars, page_count(text, page_chars) - 1)
+    if page and offset < page_start(text, page, page_chars):
+        page -= 1
+    return page
+
+# offsets of the first `limit` case-insensitive matches of query
+def find_matches(text, query, limit=MAX_MATCHES):
+    if not query:
+        return []
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    return [match.start() for match in itertools.islice(pattern.finditer(text), limit)]
+
+# navigation callbacks: they run before the rerun, so they may set the page widget's state
+def _go_to_offset(text, key, page_chars):
+    st.session_state[f"{key}_page"] = page_of(text, st.session_state[f"{key}_offset"], page_chars) + 1
+
+def _go_to_match(text, key, page_chars):
+    matches = find_matches(text, st.session_state[f"{key}_query"])
+    if matches:
+        index = min(st.session_state.get(f"{key}_match", 1), len(matches)) - 1
+        st.session_state[f"{key}_page"] = page_of(text, matches[index], page_chars) + 1
+
+def _new_query(text, key, page_chars):
+    st.session_state[f"{key}_match"] = 1
+    _go_to_match(text, key, page_chars)
+
+# paged, searchable st.code view of text; key must be unique per preview
+@st.fragment
+def text_preview(text, key, page_chars=PAGE_CHARS):
+    pages = page_count(text, page_chars)
+    if pages == 1:
+        st.code(text, language=None, wrap_lines=True)
+        return
+
+    # a page kept from a longer text that used the same key
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+
+    args = (text, key, page_chars)
+    col1, col2, col3 = st.columns([1, 1, 2])
+    page = col1.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, key=f"{key}_page")
+    col2.number_input(
+        "Go to character", min_value=0, max_value=len(text), value=0, step=page_chars,
+        key=f"{key}_offset", on_change=_go_to_offset, args=args
+    )
+    query = col3.text_input("Search", key=f"{key}_query", on_change=_new_query, args=args)
+
+    matches = find_matches(text, query)
+    if query and matches:
+        more = "+" if len(matches) == MAX_MATCHES else ""
+        st.number_input(
+            f"Match (of {len(matches):,}{more})", min_value=1, max_value=len(matches),
+            key=f"{key}_match", on_change=_go_to_match, args=args
+        )
+    elif query:
+        st.caption("No matches.")
+
+    start, end = page_start(text, page - 1, page_chars), page_start(text, page, page_chars)
+    st.caption(f"Characters {start:,}-{end:,} of {len(text):,}")
+    st.code(text[start:end], language=None, wrap_lines=True)
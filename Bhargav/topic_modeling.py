@@ -1,26 +1,268 @@
-from sklearn.decomposition import LatentDirichletAllocation, NMF
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+import glob
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
 import pandas as pd
+import perf
 
-def split_into_documents(text, chunk_size=400):
+# scikit-learn and joblib are imported inside the functions: they dominate
+# the app's import time and are only needed once analysis runs
+
+CHUNK_SIZE = 400
+_WORD = re.compile(r"\S+")
+
+def split_into_documents(text, chunk_size=CHUNK_SIZE):
     words = text.split()
     return [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
 
+# same chunks as split_into_documents, one at a time: words are matched in
+# place, so neither the word list nor the chunk list is ever built
+def iter_documents(text, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for match in _WORD.finditer(text):
+        chunk.append(match.group())
+        if len(chunk) == chunk_size:
+            yield " ".join(chunk)
+            chunk = []
+    if chunk:
+        yield " ".join(chunk)
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def make_model(algorithm, n_topics):
+    from sklearn.decomposition import LatentDirichletAllocation, NMF
+    if algorithm == "LDA":
+        return LatentDirichletAllocation(n_components=n_topics, random_state=42)
+    return NMF(n_components=n_topics, random_state=42)
+
+@perf.timed()
 def train_topic_model(docs, algorithm="LDA", n_topics=5):
+    from sklearn.feature_extraction.text import CountVectorizer
     vectorizer = CountVectorizer(max_features=1000)
     dtm = vectorizer.fit_transform(docs)
 
-    if algorithm == "LDA":
-        model = LatentDirichletAllocation(n_components=n_topics, random_state=42)
-    else:
-        model = NMF(n_components=n_topics, random_state=42)
-
+    model = make_model(algorithm, n_topics)
     model.fit(dtm)
     return model, vectorizer, dtm, vectorizer.get_feature_names_out()
 
+# ---------- Automatic topic count ----------
+# One document-term matrix is built and models for every K are fitted on it
+# in parallel (joblib memory-maps the matrix into the workers instead of
+# copying it). Each K is scored on fit quality (LDA perplexity / NMF
+# reconstruction error, lower is better) and NPMI coherence of its top words
+# (higher is better); both are min-max scaled over the sweep and averaged.
+
+AUTO_K_RANGE = range(2, 11)
+COHERENCE_WORDS = 10
+COHERENCE_WEIGHT = 0.5
+
+def _fit_k(dtm, algorithm, k):
+    model = make_model(algorithm, k)
+    model.fit(dtm)
+    # LDA stores the perplexity of its final E-step, so scoring costs nothing extra
+    fit_error = model.bound_ if algorithm == "LDA" else model.reconstruction_err_
+    return k, model, fit_error
+
+def npmi_coherence(components, binary_dtm, n_words=COHERENCE_WORDS):
+    # document co-occurrence of each topic's top words, from the sparse
+    # binary matrix (only n_words columns are ever densified)
+    n_docs = binary_dtm.shape[0]
+    doc_freq = np.asarray(binary_dtm.sum(axis=0)).ravel() / n_docs
+    scores = []
+    for topic in components:
+        top = topic.argsort()[::-1][:n_words]
+        sub = binary_dtm[:, top]
+        p_ij = (sub.T @ sub).toarray() / n_docs
+        i, j = np.triu_indices(len(top), 1)
+        p_pair, p_i, p_j = p_ij[i, j], doc_freq[top][i], doc_freq[top][j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            npmi = np.log(p_pair / (p_i * p_j)) / -np.log(p_pair)
+        npmi = np.where(p_pair <= 0, -1.0, np.where(p_pair >= 1, 1.0, npmi))
+        scores.append(npmi.mean() if len(npmi) else 0.0)
+    return float(np.mean(scores))
+
+def _scaled(values):
+    values = np.asarray(values, dtype=float)
+    span = values.max() - values.min()
+    return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+@perf.timed()
+def auto_topic_model(docs, algorithm="LDA", k_values=AUTO_K_RANGE, n_jobs=None):
+    from joblib import Parallel, delayed
+    from sklearn.feature_extraction.text import CountVectorizer
+    vectorizer = CountVectorizer(max_features=1000)
+    dtm = vectorizer.fit_transform(docs)
+    binary_dtm = (dtm > 0).astype(np.float64).tocsc()
+
+    # K above the number of chunks only splits the same documents further
+    k_values = [k for k in k_values if k <= max(len(docs), min(k_values))]
+    if n_jobs is None:
+        n_jobs = min(len(k_values), os.cpu_count() or 1)
+
+    fits = Parallel(n_jobs=n_jobs, max_nbytes="1M", mmap_mode="r")(
+        delayed(_fit_k)(dtm, algorithm, k) for k in k_values
+    )
+
+    fit_errors = [fit_error for _, _, fit_error in fits]
+    coherence = [npmi_coherence(model.components_, binary_dtm) for _, model, _ in fits]
+    scores = COHERENCE_WEIGHT * _scaled(coherence) + (1 - COHERENCE_WEIGHT) * (1 - _scaled(np.log(fit_errors)))
+    best = int(np.argmax(scores))  # ties go to the smaller K
+
+    sweep = pd.DataFrame({
+        "K": k_values,
+        "perplexity" if algorithm == "LDA" else "reconstruction_error": np.round(fit_errors, 3),
+        "npmi": np.round(coherence, 4),
+        "score": np.round(scores, 4),
+        "selected": [i == best for i in range(len(k_values))]
+    })
+    model = fits[best][1]
+    return model, vectorizer, dtm, vectorizer.get_feature_names_out(), sweep
+
+# ---------- Incremental LDA ----------
+# Hashed features need no vocabulary refit, so new documents are folded into
+# the saved model with partial_fit. Each hashed column is named after the most
+# frequent word seen in it; documents already learned are skipped. Each
+# number of topics keeps its own state file (topic_state.k5.joblib), so
+# switching it does not throw away the other models.
+
+N_FEATURES = 2 ** 16
+TOPIC_STATE_PATH = os.environ.get("MMA_TOPIC_STATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "topic_state.joblib"))
+
+_state_lock = threading.Lock()
+
+def hashing_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=N_FEATURES, alternate_sign=False, norm=None)
+
+def update_term_names(term_names, docs, vectorizer):
+    analyzer = vectorizer.build_analyzer()
+    counts = Counter(t for d in docs for t in analyzer(d))
+    if not counts:
+        return
+    words = list(counts)
+    for word, column in zip(words, vectorizer.transform(words).indices):
+        name, count = term_names.get(column, (word, 0))
+        if name == word:
+            term_names[column] = (word, count + counts[word])
+        elif counts[word] > count:
+            term_names[column] = (word, counts[word])
+
+def feature_names(term_names):
+    features = np.full(N_FEATURES, "", dtype=object)
+    for column, (word, _) in term_names.items():
+        features[column] = word
+    return features
+
+def topic_state_path(n_topics, path=TOPIC_STATE_PATH):
+    root, ext = os.path.splitext(path)
+    return f"{root}.k{n_topics}{ext}"
+
+def load_topic_state(path=TOPIC_STATE_PATH):
+    import joblib
+    return joblib.load(path) if os.path.exists(path) else None
+
+def save_topic_state(state, path=TOPIC_STATE_PATH):
+    import joblib
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+# removes the saved models for every number of topics
+def reset_topic_state(path=TOPIC_STATE_PATH):
+    root, ext = os.path.splitext(path)
+    for state_path in glob.glob(f"{glob.escape(root)}.k*{ext}"):
+        os.remove(state_path)
+
+@perf.timed()
+def update_topic_model(docs, n_topics=5, path=TOPIC_STATE_PATH):
+    from sklearn.decomposition import LatentDirichletAllocation
+    vectorizer = hashing_vectorizer()
+    state_path = topic_state_path(n_topics, path)
+    with _state_lock:
+        state = load_topic_state(state_path)
+        if state is None:
+            state = {
+                "n_topics": n_topics,
+                "model": LatentDirichletAllocation(n_components=n_topics, learning_method="online", random_state=42),
+                "term_names": {},
+                "seen": set()
+            }
+
+        new_docs = []
+        for d in docs:
+            digest = hashlib.sha1(d.encode("utf-8")).hexdigest()
+            if digest not in state["seen"]:
+                state["seen"].add(digest)
+                new_docs.append(d)
+
+        if new_docs:
+            update_term_names(state["term_names"], new_docs, vectorizer)
+            # updates are weighted by total_samples / batch size: use the
+            # documents learned so far, not the default of a million
+            state["model"].total_samples = len(state["seen"])
+            state["model"].partial_fit(vectorizer.transform(new_docs))
+            save_topic_state(state, state_path)
+
+    dtm = vectorizer.transform(docs)
+    return state["model"], vectorizer, dtm, feature_names(state["term_names"])
+
+# ---------- Streaming topic model ----------
+# For corpora too large for a vocabulary: chunks are hashed batch by batch and
+# fed to online LDA / MiniBatchNMF with partial_fit, so memory depends on the
+# batch size and N_FEATURES, not on the corpus. Hashed columns are named from
+# a sample of the batches (update_term_names), enough for the frequent words
+# that make up topics.
+
+STREAM_BATCH_DOCS = 256
+TERM_SAMPLE_EVERY = 4   # name columns from every 4th batch
+STREAMING_WORDS = 2_000_000   # processed words above which the app streams by default
+
+def make_streaming_model(algorithm, n_topics):
+    from sklearn.decomposition import LatentDirichletAllocation, MiniBatchNMF
+    if algorithm == "LDA":
+        return LatentDirichletAllocation(n_components=n_topics, learning_method="online", random_state=42)
+    return MiniBatchNMF(n_components=n_topics, batch_size=STREAM_BATCH_DOCS, random_state=42)
+
+@perf.timed()
+def train_streaming_topic_model(text, algorithm="LDA", n_topics=5, batch_docs=STREAM_BATCH_DOCS, passes=1, documents=None):
+    # returns (model, vectorizer, None, features): there is no corpus-wide
+    # document-term matrix to return in this mode. documents (a list, e.g.
+    # CSV rows) replaces the word chunks of text
+    vectorizer = hashing_vectorizer()
+    model = make_streaming_model(algorithm, n_topics)
+    term_names = {}
+    seen = 0
+    for p in range(passes):
+        docs = iter_documents(text) if documents is None else documents
+        for i, batch in enumerate(iter_batches(docs, batch_docs)):
+            if p == 0 and i % TERM_SAMPLE_EVERY == 0:
+                update_term_names(term_names, batch, vectorizer)
+            if p == 0:
+                seen += len(batch)
+            if algorithm == "LDA":
+                # documents so far (the whole corpus after the first pass)
+                model.total_samples = seen
+            model.partial_fit(vectorizer.transform(batch))
+    if not term_names:
+        raise ValueError("no documents to model")
+    return model, vectorizer, None, feature_names(term_names)
+
 def get_topic_words(model, features, n_words=8):
     rows = []
     for i, topic in enumerate(model.components_):
-        words = [features[j] for j in topic.argsort()[-n_words:]]
+        # hashed features may have unnamed (never seen) columns
+        top = [j for j in topic.argsort()[::-1] if features[j]][:n_words]
+        words = [features[j] for j in reversed(top)]
         rows.append({"Topic": i, "TopWords": ", ".join(words)})
     return pd.DataFrame(rows)
\ No newline at end of file
@@ -0,0 +1,237 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import perf
+from corpus_store import CorpusStore
+from parallel import DEFAULT_WORKERS, get_pool, shutdown_pool
+from pipeline import MIME_TYPES, analyze_path, analyze_corpus
+
+# Headless batch runner: the render_ui stages over a directory or glob.
+#   python batch.py data/ "more/**/*.pdf" --out results/ --workers 8
+# Writes one JSON line per document to <out>/documents.jsonl as results
+# arrive and the corpus-level results to <out>/corpus.json at the end.
+# Re-running with the same --out skips documents already in documents.jsonl
+# (same path, size and mtime), so an interrupted run picks up where it stopped.
+# Stage timings of the run go to <out>/perf.json and <out>/perf.prom.
+# Preprocessed tokens are kept in the memory-mapped store <out>/corpus/
+# (see corpus_store.py), which the topic model reads instead of re-vectorizing.
+
+DOCUMENTS_FILE = "documents.jsonl"
+STORE_DIR = "corpus"
+CORPUS_FILE = "corpus.json"
+PROGRESS_SECONDS = 5
+
+
+def find_files(inputs):
+    """
+    Files matching the inputs (directories are walked), sorted and de-duplicated
+    """
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, f) for f in files)
+        else:
+            paths.update(glob.glob(pattern, recursive=True))
+    return sorted(
+        os.path.abspath(p) for p in paths
+        if os.path.isfile(p) and p.rsplit(".", 1)[-1].lower() in MIME_TYPES
+    )
+
+
+def file_key(path):
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+
+def store_name(key):
+    path, size, mtime_ns = key
+    return f"{path}|{size}|{mtime_ns}"
+
+
+def load_done(documents_path):
+    """
+    Keys of documents already written. A final line cut off by a crash is
+    dropped from the file so new records start on a clean line; unreadable
+    complete lines are skipped (and reported) but left in place.
+    """
+    done = {}
+    if not os.path.exists(documents_path):
+        return done
+    valid_bytes = 0
+    with open(documents_path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            if not line.endswith(b"\n"):
+                break   #only the last line can be unterminated
+            valid_bytes += len(line)
+            try:
+                record = json.loads(line)
+                done[(record["path"], record["file_size"], record["mtime_ns"])] = record
+            except (ValueError, TypeError, KeyError) as e:
+                if line.strip():
+                    print(f"{documents_path}:{number}: skipping unreadable record ({e})", file=sys.stderr)
+    if valid_bytes < os.path.getsize(documents_path):
+        with open(documents_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def _analyze(key):
+    path, size, mtime_ns = key
+    try:
+        record = analyze_path(path, keep_tokens=True)
+    except Exception as e:
+        record = {"path": path, "name": os.path.basename(path), "error": f"{type(e).__name__}: {e}"}
+    record["file_size"] = size
+    record["mtime_ns"] = mtime_ns
+    return record
+
+
+def run_documents(keys, workers):
+    """
+    Yields one record per key as soon as it is ready (not in input order).
+    At most a few documents per worker are in flight at a time.
+    """
+    if workers <= 1:
+        for key in keys:
+            yield _analyze(key)
+        return
+
+    pool = get_pool(workers)
+    pending = set()
+    keys = iter(keys)
+    while True:
+        for key in keys:
+            pending.add(pool.submit(_analyze, key))
+            if len(pending) >= workers * 4:
+                break
+        if not pending:
+            return
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            yield future.result()
+
+
+def _num_topics(value):
+    return value if value == "auto" else int(value)
+
+
+class Progress:
+
+    def __init__(self, total, stream=sys.stderr):
+        self.total = total
+        self.stream = stream
+        self.docs = 0
+        self.bytes = 0
+        self.errors = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, record):
+        self.docs += 1
+        self.bytes += record.get("file_size", 0)
+        self.errors += "error" in record
+        now = time.perf_counter()
+        if now - self.last >= PROGRESS_SECONDS or self.docs == self.total:
+            self.last = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        rate = self.docs / elapsed if elapsed else 0
+        eta = (self.total - self.docs) / rate if rate else 0
+        print(
+            f"[{self.docs}/{self.total}] {rate:.1f} docs/s, "
+            f"{self.bytes / (1024 * 1024) / elapsed if elapsed else 0:.2f} MB/s, "
+            f"{self.errors} errors, ETA {eta:.0f}s",
+            file=self.stream, flush=True
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the NarrativeNexus pipeline over files on disk")
+    parser.add_argument("inputs", nargs="+", help="directories or glob patterns (quote ** patterns)")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--num-topics", type=_num_topics, default=5, help='a number, or "auto" to pick one')
+    parser.add_argument("--summary-method", choices=["frequency", "tfidf", "textrank"], default="frequency")
+    parser.add_argument("--incremental-topics", action="store_true", help="update the saved incremental topic model")
+    parser.add_argument("--no-dedup", action="store_true", help="model near-duplicate documents separately")
+    parser.add_argument("--abstractive", action="store_true", help="also run the BART summarizer")
+    parser.add_argument("--restart", action="store_true", help="ignore results of a previous run")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    documents_path = os.path.join(args.out, DOCUMENTS_FILE)
+    store_path = os.path.join(args.out, STORE_DIR)
+    if args.restart:
+        if os.path.exists(documents_path):
+            os.remove(documents_path)
+        if os.path.isdir(store_path):
+            shutil.rmtree(store_path)
+
+    done = load_done(documents_path)
+    store = CorpusStore(store_path, "a")
+    store_rows = {name: i for i, name in enumerate(store.names)}
+    keys = [file_key(path) for path in find_files(args.inputs)]
+    todo = [key for key in keys if key not in done]
+    print(f"{len(keys)} files, {len(keys) - len(todo)} already done, {len(todo)} to process", file=sys.stderr)
+
+    progress = Progress(len(todo))
+    recording = perf.start()
+    try:
+        with open(documents_path, "a", encoding="utf-8") as out:
+            for record in run_documents(todo, args.workers):
+                recording.merge(record.pop("perf", []))
+                key = (record["path"], record["file_size"], record["mtime_ns"])
+                tokens = record.pop("tokens", None)
+                if tokens and store_name(key) not in store_rows:
+                    #tokens first: a record is only "done" once its tokens are stored
+                    store_rows[store_name(key)] = len(store)
+                    store.add(tokens, store_name(key))
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                done[key] = record
+                progress.update(record)
+    finally:
+        shutdown_pool()
+
+    #corpus-level results over this run's files (including ones done earlier)
+    docs = [
+        {
+            "name": done[key]["name"],
+            "cleaned_text": done[key].get("processed_text", ""),
+            "sentiment": done[key].get("sentiment", {}).get("sentiment"),
+            "compound_score": done[key].get("sentiment", {}).get("compound", 0),
+            "store_row": store_rows.get(store_name(key))
+        }
+        for key in keys if "error" not in done[key]
+    ]
+    #results from before the store existed have no tokens in it: vectorize the text then
+    modelled = [item for item in docs if item["cleaned_text"]]
+    use_store = all(item["store_row"] is not None for item in modelled)
+    start = time.perf_counter()
+    corpus = analyze_corpus(
+        docs, num_topics=args.num_topics, summary_method=args.summary_method,
+        abstractive=args.abstractive, incremental=args.incremental_topics, dedup=not args.no_dedup,
+        store=CorpusStore(store_path) if use_store else None
+    )
+    corpus["errors"] = [done[key]["path"] for key in keys if "error" in done[key]]
+    print(f"corpus analysis: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    corpus_path = os.path.join(args.out, CORPUS_FILE)
+    with open(corpus_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=2)
+    os.replace(corpus_path + ".tmp", corpus_path)
+    perf.stop()
+    perf.export(recording, args.out)
+    print(f"wrote {documents_path} and {corpus_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import codecs
+import os
+import signal
+import threading
+from contextlib import contextmanager
 import pandas as pd
-import PyPDF2
-from docx import Document
+import perf
 
 def get_file_details(file):
     return {
@@ -10,24 +14,210 @@ def get_file_details(file):
         "extension": file.name.split(".")[-1]
     }
 
-def extract_text(file):
+CSV_CHUNK_ROWS = 5000           # rows read per pandas chunk
+CSV_BLOCK_BYTES = 4 * 1024 * 1024   # bytes parsed per pyarrow block (CSV rows as documents)
+TEXT_CHUNK_BYTES = 1024 * 1024  # bytes read per block of a .txt file
+PAGE_TIMEOUT = float(os.environ.get("NN_PAGE_TIMEOUT", "30"))   # seconds per PDF page, 0 = no limit
+
+
+class PageTimeout(Exception):
+    pass
+
+
+@contextmanager
+def page_timeout(seconds):
+    """
+    Raises PageTimeout when the block runs longer than seconds (SIGALRM).
+    Signals only reach a process's main thread, so elsewhere the block runs
+    without a limit; the app extracts PDFs in worker processes for this.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expired(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def iter_pdf_pages(pdf, start=0, stop=None, timeout=None, timed_out=None):
+    """
+    Text of pages start..stop-1 of a PyPDF2 reader, one page at a time.
+    A page that takes longer than timeout (default PAGE_TIMEOUT) gives ""
+    and its number (1-based) is appended to timed_out.
+    """
+    timeout = PAGE_TIMEOUT if timeout is None else timeout
+    pages = pdf.pages
+    #the page tree is walked once here, before any page, so an interrupted page
+    #never leaves the reader half-built
+    total = _page_total(pdf, timeout)
+    stop = total if stop is None else stop
+    for i in range(start, stop):
+        page = pages[i]
+        try:
+            with page_timeout(timeout):
+                text = page.extract_text() or ""
+        except PageTimeout:
+            text = ""
+            if timed_out is not None:
+                timed_out.append(i + 1)
+        yield text
+
+
+def _page_total(pdf, timeout):
+    #walking the page tree of a malformed PDF can take as long as a page
+    try:
+        with page_timeout(timeout):
+            return len(pdf.pages)
+    except PageTimeout:
+        raise PageTimeout(f"reading the page tree took over {timeout}s") from None
+
+
+def pdf_page_count(path, timeout=None):
+    """
+    Worker task: pages of the PDF file at path (raises when it cannot be
+    read within timeout, default PAGE_TIMEOUT)
+    """
+    import PyPDF2
+    with open(path, "rb") as f:
+        return _page_total(PyPDF2.PdfReader(f), PAGE_TIMEOUT if timeout is None else timeout)
+
+
+def extract_pdf_range(path, start, stop, timeout=None):
+    """
+    Worker task for page-parallel PDFs: (page texts, timed-out page numbers)
+    for pages start..stop-1 of the PDF file at path
+    """
+    import PyPDF2
+    timed_out = []
+    with open(path, "rb") as f:
+        pdf = PyPDF2.PdfReader(f)
+        return list(iter_pdf_pages(pdf, start, stop, timeout, timed_out)), timed_out
+
+
+def iter_extract_text(file, chunk_rows=CSV_CHUNK_ROWS, timed_out=None, errors=None):
+    """
+    Streaming extraction: yields the text piece by piece (1 MB blocks, PDF pages,
+    DOCX paragraphs, CSV row chunks). Concatenating the pieces gives exactly
+    extract_text(file), and every piece boundary falls on whitespace, so words
+    can be counted per piece. Errors are yielded as a final "ERROR: ..." piece
+    (and their message appended to errors).
+    PDF pages over PAGE_TIMEOUT are left out and listed in timed_out.
+    """
+    started = False
     try:
         if file.type == "text/plain":
-            return file.read().decode("utf-8")
-        
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            carry = ""
+            while True:
+                block = file.read(TEXT_CHUNK_BYTES)
+                text = carry + decoder.decode(block, final=not block)
+                if not block:
+                    break
+                #cut at the last whitespace so no word is split between pieces
+                cut = max(text.rfind(" "), text.rfind("\n"))
+                if cut <= 0:
+                    carry = text
+                    continue
+                carry = text[cut:]
+                started = True
+                yield text[:cut]
+            if text:
+                started = True
+                yield text
+
         elif file.type == "application/pdf":
+            import PyPDF2
             pdf = PyPDF2.PdfReader(file)
-            return "\n".join([page.extract_text() or "" for page in pdf.pages])
-        
+            for i, text in enumerate(iter_pdf_pages(pdf, timed_out=timed_out)):
+                started = True
+                yield ("\n" if i else "") + text
+
         elif file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+            from docx import Document
             doc = Document(file)
-            return "\n".join([p.text for p in doc.paragraphs])
-        
+            for i, p in enumerate(doc.paragraphs):
+                started = True
+                yield ("\n" if i else "") + p.text
+
         elif file.type == "text/csv":
-            df = pd.read_csv(file)
-            return " ".join(df.astype(str).values.flatten())
-        
-        else:
-            return ""
+            for i, df in enumerate(pd.read_csv(file, chunksize=chunk_rows)):
+                if df.empty:
+                    continue
+                started = True
+                yield (" " if i else "") + " ".join(df.astype(str).values.flatten())
+
     except Exception as e:
-        return f"ERROR: {e}"
+        if errors is not None:
+            errors.append(str(e))
+        yield ("\n" if started else "") + f"ERROR: {e}"
+
+
+#CSV ROWS AS DOCUMENTS
+
+def csv_columns(file):
+    """
+    Column names of a CSV file (only the header is parsed)
+    """
+    file.seek(0)
+    columns = [str(column) for column in pd.read_csv(file, nrows=0).columns]
+    file.seek(0)
+    return columns
+
+
+def _csv_column_chunks(file, columns):
+    """
+    Yields {column: list of str} for consecutive blocks of rows, parsing only
+    the given columns: pyarrow's streaming reader when installed, else pandas
+    chunks. Values are read as strings (no type inference); empty cells are "".
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+    except ImportError:
+        file.seek(0)
+        for df in pd.read_csv(file, usecols=columns, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_ROWS):
+            yield {column: df[column].tolist() for column in columns}
+        return
+
+    reader = pv.open_csv(
+        pa.BufferReader(file.getvalue()),
+        read_options=pv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        parse_options=pv.ParseOptions(newlines_in_values=True),   #free-text answers span lines
+        convert_options=pv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: pa.string() for column in columns}
+        )
+    )
+    for batch in reader:
+        yield {column: batch.column(column).to_pylist() for column in columns}
+
+
+def iter_csv_rows(file, text_column, id_column=None):
+    """
+    Each row of a CSV file as one document: yields (ids, texts) batches
+    (a few thousand rows each). Only text_column and id_column (e.g. a
+    response id or timestamp) are read; without id_column the ids are the
+    1-based row numbers. Rows with an empty text are skipped.
+    """
+    columns = [text_column] + ([id_column] if id_column and id_column != text_column else [])
+    row = 0
+    for chunk in perf.timed_iter("extract_text", _csv_column_chunks(file, columns)):
+        texts = chunk[text_column]
+        ids = chunk[id_column] if id_column else range(row + 1, row + len(texts) + 1)
+        row += len(texts)
+        keep = [i for i, text in enumerate(texts) if text and not text.isspace()]
+        if keep:
+            yield [ids[i] for i in keep], [texts[i] for i in keep]
+
+
+@perf.timed()
+def extract_text(file):
+    return "".join(iter_extract_text(file))
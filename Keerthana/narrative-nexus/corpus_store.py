@@ -0,0 +1,230 @@
+import json
+import os
+import numpy as np
+
+# Memory-mapped store of preprocessed tokens, encoded as integer ids.
+# A store directory holds
+#   vocab.jsonl   the vocabulary, one JSON string per line; a word's id is its line
+#   tokens.i32    token ids of every document back to back (int32)
+#   offsets.i64   n_docs + 1 offsets into tokens (int64), starting with 0
+#   names.jsonl   one JSON string per document (a key chosen by the caller)
+# Readers np.memmap the two arrays, so worker processes and sessions share one
+# copy through the OS page cache. Every file is only ever appended to.
+# Appends go tokens -> vocab -> names -> offsets: a document exists once its
+# offset is written, and opening a store for appending trims whatever an
+# interrupted append left behind (words it added to the vocabulary are kept).
+# One writer at a time.
+
+TOKEN_DTYPE = np.dtype("<i4")
+OFFSET_DTYPE = np.dtype("<i8")
+BLOCK_TOKENS = 1 << 22   #tokens per block when building sparse matrices
+
+
+class CorpusStore:
+
+    def __init__(self, directory, mode="r"):
+        """
+        mode: "r" to read, "a" to read and append (creates the store)
+        """
+        self.directory = directory
+        self.mode = mode
+        self._tokens = self._offsets = None
+
+        if mode == "a":
+            os.makedirs(directory, exist_ok=True)
+            if not os.path.exists(self._path("offsets.i64")):
+                np.zeros(1, dtype=OFFSET_DTYPE).tofile(self._path("offsets.i64"))
+                open(self._path("tokens.i32"), "wb").close()
+                open(self._path("names.jsonl"), "w").close()
+                open(self._path("vocab.jsonl"), "w").close()
+            self._upgrade_vocab()
+
+        self.vocab = self._read_vocab()
+        self._ids = {word: i for i, word in enumerate(self.vocab)}
+
+        n_docs = len(self.offsets) - 1
+        self.names = []
+        self._names_bytes = 0
+        with open(self._path("names.jsonl"), "rb") as f:
+            for _, line in zip(range(n_docs), f):
+                self.names.append(json.loads(line))
+                self._names_bytes += len(line)
+
+        if mode == "a":
+            self._repair()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _upgrade_vocab(self):
+        #stores written before vocab.jsonl kept the vocabulary as one JSON list
+        old = self._path("vocab.json")
+        if os.path.exists(old) and not os.path.exists(self._path("vocab.jsonl")):
+            with open(old, encoding="utf-8") as f:
+                vocab = json.load(f)
+            tmp = self._path("vocab.jsonl.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(word, ensure_ascii=False) + "\n" for word in vocab)
+            os.replace(tmp, self._path("vocab.jsonl"))
+            os.remove(old)
+
+    def _read_vocab(self):
+        path = self._path("vocab.jsonl")
+        if not os.path.exists(path):
+            with open(self._path("vocab.json"), encoding="utf-8") as f:
+                return json.load(f)
+        vocab = []
+        self._vocab_bytes = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   #cut off by an interrupted append
+                vocab.append(json.loads(line))
+                self._vocab_bytes += len(line)
+        return vocab
+
+    def _repair(self):
+        #drop tokens / names written after the last complete document
+        end = int(self.offsets[-1]) * TOKEN_DTYPE.itemsize
+        if os.path.getsize(self._path("tokens.i32")) != end:
+            with open(self._path("tokens.i32"), "r+b") as f:
+                f.truncate(end)
+        if os.path.getsize(self._path("names.jsonl")) != self._names_bytes:
+            with open(self._path("names.jsonl"), "r+b") as f:
+                f.truncate(self._names_bytes)
+        if os.path.getsize(self._path("vocab.jsonl")) != self._vocab_bytes:
+            with open(self._path("vocab.jsonl"), "r+b") as f:
+                f.truncate(self._vocab_bytes)
+        self._tokens = None
+
+    @staticmethod
+    def _map(path, dtype):
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = self._map(self._path("tokens.i32"), TOKEN_DTYPE)
+        return self._tokens
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = self._map(self._path("offsets.i64"), OFFSET_DTYPE)
+        return self._offsets
+
+    def __len__(self):
+        return len(self.names)
+
+    def document(self, i):
+        """
+        Tokens of document i, decoded back to words
+        """
+        return [self.vocab[t] for t in self.tokens[self.offsets[i]:self.offsets[i + 1]]]
+
+    def add(self, tokens, name=None):
+        self.add_many([(tokens, name)])
+
+    def add_many(self, docs):
+        """
+        Appends (tokens, name) pairs; tokens is a list of words
+        """
+        if self.mode != "a":
+            raise ValueError("CorpusStore opened read-only; use mode=\"a\" to append")
+
+        ids = self._ids
+        new_words = []
+        encoded, names, lengths = [], [], []
+        for tokens, name in docs:
+            for word in tokens:
+                if word not in ids:
+                    ids[word] = len(self.vocab)
+                    self.vocab.append(word)
+                    new_words.append(word)
+            encoded.append(np.fromiter((ids[word] for word in tokens), dtype=TOKEN_DTYPE, count=len(tokens)))
+            names.append(name)
+            lengths.append(len(tokens))
+        if not names:
+            return
+
+        with open(self._path("tokens.i32"), "ab") as f:
+            for array in encoded:
+                array.tofile(f)
+        if new_words:
+            with open(self._path("vocab.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(word, ensure_ascii=False) + "\n" for word in new_words)
+        with open(self._path("names.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(name, ensure_ascii=False) + "\n" for name in names)
+        with open(self._path("offsets.i64"), "ab") as f:
+            (int(self.offsets[-1]) + np.cumsum(lengths, dtype=OFFSET_DTYPE)).astype(OFFSET_DTYPE).tofile(f)
+
+        self.names.extend(names)
+        self._tokens = self._offsets = None   #remap to see the new data
+
+    def count_matrix(self, rows=None, block_tokens=BLOCK_TOKENS):
+        """
+        Sparse documents x vocabulary counts (CSR) for rows (default: all),
+        built block by block straight from the mapped arrays
+        """
+        from scipy import sparse
+
+        tokens, offsets = self.tokens, self.offsets
+        n_vocab = len(self.vocab)
+        contiguous = rows is None
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        lengths = offsets[rows + 1] - offsets[rows]
+        ends = np.cumsum(lengths)
+
+        blocks = []
+        start = 0
+        while start < len(rows):
+            #as many documents as fit in block_tokens (at least one)
+            done = ends[start - 1] if start else 0
+            end = max(start + 1, int(np.searchsorted(ends, done + block_tokens, side="right")))
+            block_rows = rows[start:end]
+            #one block is copied at a time (sum_duplicates sorts in place)
+            if contiguous:
+                indices = np.array(tokens[offsets[block_rows[0]]:offsets[block_rows[-1] + 1]])
+            else:
+                indices = np.concatenate([tokens[offsets[r]:offsets[r + 1]] for r in block_rows])
+            indptr = np.concatenate([[0], np.cumsum(lengths[start:end])])
+            block = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.int64), indices, indptr),
+                shape=(len(block_rows), n_vocab)
+            )
+            block.sum_duplicates()
+            blocks.append(block)
+            start = end
+
+        if not blocks:
+            return sparse.csr_matrix((0, n_vocab), dtype=np.int64)
+        return sparse.vstack(blocks, format="csr")
+
+    def doc_term_matrix(self, rows=None, stop_words=None, min_df=1, max_df=1.0, min_token_length=2):
+        """
+        Same matrix and feature names as CountVectorizer(stop_words=...,
+        min_df=..., max_df=...).fit_transform over the documents joined by
+        spaces, without building or re-tokenizing any strings.
+        Returns (matrix, feature_names).
+        """
+        if stop_words == "english":
+            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+            stop_words = ENGLISH_STOP_WORDS
+        stop_words = stop_words or ()
+
+        X = self.count_matrix(rows)
+        n_docs = X.shape[0]
+        vocab = np.array(self.vocab, dtype=object)
+        doc_freq = np.bincount(X.indices, minlength=len(vocab))
+
+        #float df limits are fractions of the documents, ints are counts (as in sklearn)
+        max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+        min_count = min_df if isinstance(min_df, int) else min_df * n_docs
+        keep = (doc_freq > 0) & (doc_freq >= min_count) & (doc_freq <= max_count)
+        keep &= np.array([len(w) >= min_token_length and w not in stop_words for w in self.vocab], dtype=bool)
+
+        columns = np.flatnonzero(keep)
+        columns = columns[np.argsort(vocab[columns], kind="stable")]   #alphabetical, like CountVectorizer
+        return X[:, columns], vocab[columns]
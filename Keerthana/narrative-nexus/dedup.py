@@ -0,0 +1,150 @@
+import numpy as np
+import perf
+
+#NEAR-DUPLICATE DETECTION
+# Documents are reduced to MinHash signatures over word shingles (sets of
+# SHINGLE_SIZE consecutive tokens); the share of equal signature entries
+# estimates their Jaccard similarity. LSH banding splits each signature into
+# BANDS bands and only documents that agree on a whole band are compared, so
+# the work grows with the number of documents, not with its square.
+# Hashing is vectorized over batches of documents (multiply-shift hashes on
+# uint64, wrapping on overflow); 100k documents take a 51 MB signature matrix.
+
+NUM_PERM = 128
+BANDS = 16              # 16 bands x 8 rows: pairs above ~0.7 Jaccard become candidates
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8         # estimated Jaccard at which two documents are merged
+BATCH_SHINGLES = 1 << 15     #128 x 32k uint64: 32 MB of temporaries per batch
+_EMPTY = np.iinfo(np.uint32).max
+_CHAR_MULTIPLIERS = np.empty(0, dtype=np.uint64)
+
+
+def _char_multipliers(width):
+    global _CHAR_MULTIPLIERS
+    if len(_CHAR_MULTIPLIERS) < width:
+        with np.errstate(over="ignore"):
+            _CHAR_MULTIPLIERS = np.uint64(0x100000001B3) ** np.arange(1, width + 1, dtype=np.uint64)
+    return _CHAR_MULTIPLIERS[:width]
+
+
+def _shingles(tokens, multipliers):
+    """
+    Distinct 64-bit hashes of the document's word shingles.
+    tokens: list of words, or the cleaned text (split here)
+    """
+    if isinstance(tokens, str):
+        tokens = tokens.split()
+    elif not all(tokens):
+        tokens = [token for token in tokens if token]
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    #polynomial hash of each word's code points: sum of code[j] * M**(j + 1),
+    #summed per word over the concatenated text (no padding to the longest word)
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    codes = np.frombuffer("".join(tokens).encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.uint64)
+    starts = np.cumsum(lengths) - lengths
+    positions = np.arange(len(codes)) - np.repeat(starts, lengths)
+    encoded = np.add.reduceat(codes * _char_multipliers(int(lengths.max()))[positions], starts)
+    k = min(len(multipliers), len(encoded))   #shorter documents are one shingle
+    n = len(encoded) - k + 1
+    hashes = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        hashes += encoded[j:j + n] * multipliers[j]
+    return np.unique(hashes)
+
+
+@perf.timed()
+def minhash_signatures(token_lists, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=42):
+    """
+    uint32 signature matrix (documents x num_perm). token_lists: one token
+    list or cleaned text per document; texts are split one at a time, so a
+    large corpus never holds all token lists at once. Documents without
+    tokens get an all-max signature and are never matched.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+    a = (rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)[:, None]
+
+    signatures = np.full((len(token_lists), num_perm), _EMPTY, dtype=np.uint32)
+    batch, rows, size = [], [], 0
+
+    def flush():
+        hashes = np.concatenate(batch)
+        starts = np.cumsum([0] + [len(h) for h in batch[:-1]])
+        #universal hash per permutation: high 32 bits of a*x + b (mod 2**64)
+        permuted = ((a * hashes[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+        signatures[rows] = np.minimum.reduceat(permuted, starts, axis=1).T
+
+    with np.errstate(over="ignore"):
+        for i, tokens in enumerate(token_lists):
+            hashes = _shingles(tokens, multipliers)
+            if not len(hashes):
+                continue
+            batch.append(hashes)
+            rows.append(i)
+            size += len(hashes)
+            if size >= BATCH_SHINGLES:
+                flush()
+                batch, rows, size = [], [], 0
+        if batch:
+            flush()
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@perf.timed()
+def near_duplicate_labels(signatures, bands=BANDS, threshold=THRESHOLD):
+    """
+    labels[i] = index of the first document of i's near-duplicate cluster
+    (i itself when it has none)
+    """
+    n_docs, num_perm = signatures.shape
+    rows = num_perm // bands
+    valid = np.flatnonzero(signatures[:, 0] != _EMPTY) if n_docs else np.empty(0, dtype=np.int64)
+
+    #candidate pairs: each document against the first document of every band bucket it shares
+    firsts, others = [], []
+    with np.errstate(over="ignore"):
+        for band in range(bands):
+            block = signatures[valid, band * rows:(band + 1) * rows].astype(np.uint64)
+            keys = np.zeros(len(valid), dtype=np.uint64)
+            for column in block.T:
+                keys = keys * np.uint64(0x100000001B3) ^ column
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            new_bucket = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+            bucket_first = order[np.flatnonzero(new_bucket)[np.cumsum(new_bucket) - 1]]
+            member = ~new_bucket
+            firsts.append(valid[bucket_first[member]])
+            others.append(valid[order[member]])
+
+    parent = np.arange(n_docs)
+    if firsts:
+        pairs = np.unique(np.stack([np.concatenate(firsts), np.concatenate(others)], axis=1), axis=0)
+        #keep candidates whose estimated Jaccard similarity reaches the threshold
+        for start in range(0, len(pairs), 65536):
+            chunk = pairs[start:start + 65536]
+            similar = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1) >= threshold
+            for i, j in chunk[similar]:
+                ri, rj = _find(parent, i), _find(parent, j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+    return np.array([_find(parent, i) for i in range(n_docs)], dtype=np.int64)
+
+
+def deduplicate(token_lists, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE):
+    """
+    Returns (representatives, counts, labels): the index of one document per
+    near-duplicate cluster (its first), the cluster sizes, and each
+    document's representative
+    """
+    labels = near_duplicate_labels(minhash_signatures(token_lists, num_perm, shingle_size), bands, threshold)
+    representatives, counts = np.unique(labels, return_counts=True)
+    return representatives, counts, labels
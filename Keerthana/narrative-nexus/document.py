@@ -0,0 +1,118 @@
+#PREPROCESSED DOCUMENT
+# One object per document instead of a dict holding the original text, the
+# cleaned text and the token list side by side. Only the original text,
+# the token list (or the cleaned text) and two counts are stored; every
+# other view is derived on first use and kept. Views that are no longer
+# needed can be dropped to free their memory.
+
+FIELDS = (
+    "original_text", "processed_text", "original_words", "original_chars",
+    "cleaned_words", "cleaned_chars", "word_reduction", "char_reduction", "tokens"
+)
+
+
+def _reduction(original, cleaned):
+    return round(((original - cleaned) / original) * 100, 2) if original else 0
+
+
+class Document:
+
+    __slots__ = ("original_text", "original_words", "original_chars", "_tokens", "_processed_text", "_sentences")
+
+    def __init__(self, original_text="", original_words=0, original_chars=0, tokens=None, processed_text=None):
+        """
+        Pass either tokens (list of cleaned words) or processed_text
+        """
+        self.original_text = original_text
+        self.original_words = original_words
+        self.original_chars = original_chars
+        self._tokens = tokens
+        self._processed_text = processed_text
+        self._sentences = None
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = self._processed_text.split() if self._processed_text else []
+        return self._tokens
+
+    @property
+    def processed_text(self):
+        if self._processed_text is None:
+            self._processed_text = " ".join(self._tokens or ())
+        return self._processed_text
+
+    @property
+    def sentences(self):
+        """
+        Sentences of the original text (NLTK Punkt)
+        """
+        if self._sentences is None:
+            import resources
+            from nltk.tokenize import sent_tokenize
+            resources.require("punkt")
+            self._sentences = sent_tokenize(self.original_text)
+        return self._sentences
+
+    @property
+    def cleaned_words(self):
+        if self._tokens is not None:
+            return len(self._tokens)
+        #tokens never contain spaces, so they can be counted without splitting
+        return self._processed_text.count(" ") + 1 if self._processed_text else 0
+
+    @property
+    def cleaned_chars(self):
+        if self._processed_text is not None:
+            return len(self._processed_text)
+        #length of the joined text without building it
+        tokens = self._tokens or ()
+        return sum(map(len, tokens)) + max(len(tokens) - 1, 0)
+
+    @property
+    def word_reduction(self):
+        return _reduction(self.original_words, self.cleaned_words)
+
+    @property
+    def char_reduction(self):
+        return _reduction(self.original_chars, self.cleaned_chars)
+
+    def drop(self, *views):
+        """
+        Frees views that are no longer needed: "original_text", "tokens",
+        "sentences". Counts stay available; the cleaned text is kept (and
+        built first if needed) so tokens can always be derived again.
+        """
+        for view in views:
+            if view == "original_text":
+                self.original_text = ""
+                self._sentences = None
+            elif view == "tokens":
+                if self._tokens is not None:
+                    self.processed_text
+                    self._tokens = None
+            elif view == "sentences":
+                self._sentences = None
+            else:
+                raise ValueError(f"Unknown document view: {view}")
+
+    def to_dict(self, exclude=("original_text", "tokens")):
+        return {field: getattr(self, field) for field in FIELDS if field not in exclude}
+
+    #read-only dict access, for code written against the old result dicts
+    def __getitem__(self, field):
+        if field not in FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    #pickled (worker results, result cache) as the cleaned text: one string
+    #instead of a list of token objects
+    def __getstate__(self):
+        return self.original_text, self.original_words, self.original_chars, self.processed_text
+
+    def __setstate__(self, state):
+        self.original_text, self.original_words, self.original_chars, self._processed_text = state
+        self._tokens = self._sentences = None
+
+    def __repr__(self):
+        return f"Document(original_words={self.original_words}, cleaned_words={self.cleaned_words})"
@@ -1,39 +1,344 @@
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
+import glob
+import hashlib
+import os
+import threading
+import perf
+from collections import Counter
 
-def lda_topic_model(texts, num_topics=5, num_words=10):
+@perf.timed()
+def lda_topic_model(texts, num_topics=5, num_words=10, return_matrices=False):
     """
-    LDA Topic Modeling
+    LDA Topic Modeling (num_topics="auto" picks the best K with lda_topic_sweep).
+    With return_matrices=True, returns (topics, matrices); see _matrices.
     """
+    if num_topics == "auto":
+        best_k, sweep = lda_topic_sweep(texts, num_words=num_words, return_matrices=return_matrices)
+        best = next(row for row in sweep if row["k"] == best_k)
+        return (best["topics"], best["matrices"]) if return_matrices else best["topics"]
 
-    doc_count = len(texts)
+    vectorizer = _count_vectorizer(len(texts))
+    doc_term_matrix = vectorizer.fit_transform(texts)  
 
-    vectorizer = CountVectorizer(
-        stop_words="english",   #removes english stopwords
-        max_df=0.95,            #ignores words appering in more than 95% of documents
-        min_df=1 if doc_count < 5 else 2   # id doc<5 allows words appearing once else=ignore very rare words
-    )     
+    return _fit_topics(doc_term_matrix, vectorizer.get_feature_names_out(), num_topics, num_words, return_matrices)
+
+
+@perf.timed()
+def store_topic_model(store, num_topics=5, num_words=10, rows=None, return_matrices=False):
+    """
+    lda_topic_model over documents of a corpus_store.CorpusStore (rows:
+    document indices, default all). The doc-term matrix comes straight from
+    the stored token ids, with the same vocabulary rules as _count_vectorizer.
+    """
+    doc_term_matrix, feature_names = store_doc_term(store, rows)
+    return _fit_topics(doc_term_matrix, feature_names, num_topics, num_words, return_matrices)
 
-    doc_term_matrix = vectorizer.fit_transform(texts)  
+
+def store_doc_term(store, rows=None):
+    """
+    (matrix, feature_names) of a CorpusStore, same rules as _count_vectorizer
+    """
+    doc_count = len(store) if rows is None else len(rows)
+    return store.doc_term_matrix(
+        rows, stop_words="english", max_df=0.95, min_df=1 if doc_count < 5 else 2
+    )
+
+
+def _fit_topics(doc_term_matrix, feature_names, num_topics, num_words, return_matrices):
+    from sklearn.decomposition import LatentDirichletAllocation
 
     lda = LatentDirichletAllocation(
-        n_components=min(num_topics, doc_count),
+        n_components=min(num_topics, doc_term_matrix.shape[0]),
         random_state=42
     )
 
-    lda.fit(doc_term_matrix)
+    doc_topic = lda.fit_transform(doc_term_matrix)
+
+    topics = _topic_words(lda.components_, feature_names, num_words)
+    if return_matrices:
+        return topics, _matrices(doc_topic, doc_term_matrix, lda.components_, feature_names, num_words)
+    return topics
+
+
+def _count_vectorizer(doc_count):
+    from sklearn.feature_extraction.text import CountVectorizer
+    return CountVectorizer(
+        stop_words="english",   #removes english stopwords
+        max_df=0.95,            #ignores words appering in more than 95% of documents
+        min_df=1 if doc_count < 5 else 2   # id doc<5 allows words appearing once else=ignore very rare words
+    )
+
+
+def _top_terms(components, num_words):
+    #columns of each topic's top words, in the order they are listed
+    return [topic.argsort()[-num_words:] for topic in components]
+
+
+def _matrices(doc_topic, doc_term_matrix, components, feature_names, num_words):
+    """
+    doc_topic: documents x topics distribution (rows sum to 1)
+    doc_term:  sparse documents x terms counts
+    top_terms / top_words: each topic's top columns and their words
+    """
+    top_terms = _top_terms(components, num_words)
+    return {
+        "doc_topic": doc_topic,
+        "doc_term": doc_term_matrix,
+        "top_terms": top_terms,
+        "top_words": [[feature_names[i] for i in columns] for columns in top_terms]
+    }
+
 
-    feature_names = vectorizer.get_feature_names_out()
+def _topic_words(components, feature_names, num_words):
     topics = []
 
-    for idx, topic in enumerate(lda.components_):
-        top_words = [
-            feature_names[i]
-            for i in topic.argsort()[-num_words:]
-        ]
+    for idx, columns in enumerate(_top_terms(components, num_words)):
+        top_words = [feature_names[i] for i in columns]
         topics.append({
             "topic": f"Topic {idx + 1}",
             "words": ", ".join(top_words)
         })
 
     return topics
+
+
+#AUTOMATIC TOPIC COUNT
+# Models for every K are fitted in parallel on one shared document-term
+# matrix (joblib memory-maps it into the workers instead of copying it).
+# Each K is scored on perplexity (lower is better) and NPMI coherence of its
+# top words from sparse document co-occurrence counts (higher is better);
+# both are min-max scaled over the sweep and averaged.
+
+AUTO_K_RANGE = range(2, 11)
+COHERENCE_WEIGHT = 0.5
+
+
+def _fit_lda(doc_term_matrix, k):
+    from sklearn.decomposition import LatentDirichletAllocation
+    lda = LatentDirichletAllocation(n_components=k, random_state=42)
+    lda.fit(doc_term_matrix)
+    #bound_ is the perplexity of the final E-step, so scoring costs no extra pass
+    return lda, lda.bound_
+
+
+def npmi_coherence(components, binary_dtm, num_words=10):
+    """
+    Mean NPMI over all pairs of each topic's top words, averaged over topics.
+    binary_dtm: sparse 0/1 document x term matrix (CSC for fast column slices)
+    """
+    import numpy as np
+
+    n_docs = binary_dtm.shape[0]
+    doc_freq = np.asarray(binary_dtm.sum(axis=0)).ravel() / n_docs
+    scores = []
+    for topic in components:
+        top = topic.argsort()[::-1][:num_words]
+        sub = binary_dtm[:, top]
+        p_ij = (sub.T @ sub).toarray() / n_docs
+        i, j = np.triu_indices(len(top), 1)
+        p_pair, p_i, p_j = p_ij[i, j], doc_freq[top][i], doc_freq[top][j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            npmi = np.log(p_pair / (p_i * p_j)) / -np.log(p_pair)
+        #never co-occur -> -1, always co-occur -> 1
+        npmi = np.where(p_pair <= 0, -1.0, np.where(p_pair >= 1, 1.0, npmi))
+        scores.append(npmi.mean() if len(npmi) else 0.0)
+    return float(np.mean(scores))
+
+
+def _scaled(values):
+    import numpy as np
+    values = np.asarray(values, dtype=float)
+    span = values.max() - values.min()
+    return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+
+@perf.timed()
+def lda_topic_sweep(texts, k_values=AUTO_K_RANGE, num_words=10, n_jobs=None, return_matrices=False, doc_term=None):
+    """
+    Fits LDA for every K and returns (best_k, sweep), where sweep has one
+    dict per K: "k", "perplexity", "npmi", "score", "topics"
+    (and "matrices" for the best K when return_matrices is True).
+    doc_term: precomputed (matrix, feature_names) used instead of texts
+    """
+    import numpy as np
+    from joblib import Parallel, delayed
+
+    if doc_term is None:
+        vectorizer = _count_vectorizer(len(texts))
+        doc_term = vectorizer.fit_transform(texts), vectorizer.get_feature_names_out()
+    doc_term_matrix, feature_names = doc_term
+    binary_dtm = (doc_term_matrix > 0).astype(np.float64).tocsc()
+
+    #same cap as lda_topic_model: no more topics than documents
+    k_values = sorted({min(k, doc_term_matrix.shape[0]) for k in k_values})
+    if n_jobs is None:
+        n_jobs = min(len(k_values), os.cpu_count() or 1)
+
+    fits = Parallel(n_jobs=n_jobs, max_nbytes="1M", mmap_mode="r")(
+        delayed(_fit_lda)(doc_term_matrix, k) for k in k_values
+    )
+
+    perplexity = [p for _, p in fits]
+    coherence = [npmi_coherence(lda.components_, binary_dtm, num_words) for lda, _ in fits]
+    scores = COHERENCE_WEIGHT * _scaled(coherence) + (1 - COHERENCE_WEIGHT) * (1 - _scaled(np.log(perplexity)))
+
+    sweep = [
+        {
+            "k": k,
+            "perplexity": round(float(perplexity[i]), 3),
+            "npmi": round(coherence[i], 4),
+            "score": round(float(scores[i]), 4),
+            "topics": _topic_words(fits[i][0].components_, feature_names, num_words)
+        }
+        for i, k in enumerate(k_values)
+    ]
+    best = int(np.argmax(scores))
+    if return_matrices:
+        lda = fits[best][0]
+        sweep[best]["matrices"] = _matrices(
+            lda.transform(doc_term_matrix), doc_term_matrix, lda.components_, feature_names, num_words
+        )
+    return k_values[best], sweep
+
+
+#INCREMENTAL TOPIC MODELING
+# A HashingVectorizer has no vocabulary to refit, so new documents can be
+# folded into the saved LDA with partial_fit instead of refitting everything.
+# Hashed columns are mapped back to the most frequent word seen in them.
+# Each number of topics keeps its own state file, so changing it does not
+# discard the model learned with another.
+
+N_FEATURES = 2 ** 16
+TOPIC_STATE_PATH = os.environ.get(
+    "NN_TOPIC_STATE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "topic_state.joblib")
+)
+
+_state_lock = threading.Lock()
+
+
+def _hashing_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(
+        n_features=N_FEATURES,
+        stop_words="english",
+        alternate_sign=False,   #LDA needs non-negative counts
+        norm=None
+    )
+
+
+def _new_topic_state(num_topics):
+    from sklearn.decomposition import LatentDirichletAllocation
+    return {
+        "num_topics": num_topics,
+        "lda": LatentDirichletAllocation(
+            n_components=num_topics,
+            learning_method="online",
+            random_state=42
+        ),
+        "term_names": {},   # column -> (word, count)
+        "seen": set(),      # hashes of documents already learned
+        "n_docs": 0
+    }
+
+
+def topic_state_path(num_topics, path=TOPIC_STATE_PATH):
+    """
+    State file of the model with num_topics topics: topic_state.k5.joblib
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.k{num_topics}{ext}"
+
+
+def load_topic_state(path=TOPIC_STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    import joblib
+    return joblib.load(path)
+
+
+def save_topic_state(state, path=TOPIC_STATE_PATH):
+    import joblib
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+
+def reset_topic_state(path=TOPIC_STATE_PATH):
+    """
+    Removes the saved models for every number of topics
+    """
+    root, ext = os.path.splitext(path)
+    for state_path in glob.glob(f"{glob.escape(root)}.k*{ext}"):
+        os.remove(state_path)
+
+
+def _update_term_names(term_names, texts, vectorizer):
+    analyzer = vectorizer.build_analyzer()
+    counts = Counter(token for text in texts for token in analyzer(text))
+    if not counts:
+        return
+    words = list(counts)
+    # every word is its own one-token "document", so row i has exactly one column
+    columns = vectorizer.transform(words).indices
+    for word, column in zip(words, columns):
+        name, count = term_names.get(column, (word, 0))
+        if name == word:
+            term_names[column] = (word, count + counts[word])
+        elif counts[word] > count:
+            term_names[column] = (word, counts[word])
+
+
+@perf.timed()
+def update_topic_model(texts, num_topics=5, num_words=10, path=TOPIC_STATE_PATH, return_matrices=False):
+    """
+    Incremental LDA Topic Modeling (state saved between sessions, one file
+    per num_topics next to path). With return_matrices=True, returns
+    (topics, matrices) for texts.
+    """
+    state_path = topic_state_path(num_topics, path)
+    with _state_lock:
+        state = load_topic_state(state_path)
+        if state is None:
+            state = _new_topic_state(num_topics)
+
+        new_texts = []
+        for text in texts:
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if digest not in state["seen"]:
+                state["seen"].add(digest)
+                new_texts.append(text)
+
+        if new_texts:
+            vectorizer = _hashing_vectorizer()
+            _update_term_names(state["term_names"], new_texts, vectorizer)
+            state["n_docs"] += len(new_texts)
+            #the update is weighted by total_samples / batch size: the corpus
+            #learned so far, not the default of a million documents
+            state["lda"].total_samples = state["n_docs"]
+            state["lda"].partial_fit(vectorizer.transform(new_texts))
+            save_topic_state(state, state_path)
+
+    if not state["n_docs"]:
+        return ([], None) if return_matrices else []
+
+    names = state["term_names"]
+    topics = []
+    top_terms = []
+    for idx, topic in enumerate(state["lda"].components_):
+        columns = [i for i in topic.argsort()[::-1] if i in names][:num_words][::-1]
+        top_terms.append(columns)
+        topics.append({
+            "topic": f"Topic {idx + 1}",
+            "words": ", ".join(names[i][0] for i in columns)
+        })
+
+    if not return_matrices:
+        return topics
+
+    doc_term_matrix = _hashing_vectorizer().transform(texts)
+    return topics, {
+        "doc_topic": state["lda"].transform(doc_term_matrix),
+        "doc_term": doc_term_matrix,
+        "top_terms": top_terms,
+        "top_words": [[names[i][0] for i in columns] for columns in top_terms]
+    }
@@ -0,0 +1,101 @@
+import gc
+import threading
+import time
+
+# Process-wide model registry.
+# Streamlit re-runs the script on every interaction but keeps imported modules,
+# so models stored here are loaded once per server process and shared by all
+# sessions and reruns.
+
+_loaders = {}
+_models = {}
+_stats = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, loader):
+    """
+    Register a zero-argument loader for a model (nothing is loaded yet)
+    """
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+        _stats.setdefault(name, _empty_stats())
+
+
+def _empty_stats():
+    return {
+        "load_seconds": None,
+        "loads": 0,
+        "cold_calls": 0,
+        "cold_seconds": 0.0,
+        "warm_calls": 0,
+        "warm_seconds": 0.0
+    }
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def get(name):
+    """
+    Return the model, loading it on first use
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    # one lock per model so two sessions never load the same weights twice
+    with _locks[name]:
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = _loaders[name]()
+            _stats[name]["load_seconds"] = round(time.perf_counter() - start, 3)
+            _stats[name]["loads"] += 1
+        return _models[name]
+
+
+def warm_up(*names):
+    """
+    Load the given models (all registered models if none given) ahead of time
+    """
+    for name in names or list(_loaders):
+        get(name)
+
+
+def unload(*names):
+    """
+    Drop the given models (all loaded models if none given) to free memory
+    """
+    for name in names or list(_models):
+        with _locks[name]:
+            _models.pop(name, None)
+    gc.collect()
+
+
+def record_call(name, seconds, cold):
+    """
+    Record one inference call; cold calls are the ones that triggered a load
+    """
+    kind = "cold" if cold else "warm"
+    _stats[name][f"{kind}_calls"] += 1
+    _stats[name][f"{kind}_seconds"] += seconds
+
+
+def latency_report(name):
+    """
+    Cold (load + first inference) and warm (inference only) latency in seconds
+    """
+    stats = _stats[name]
+    cold_avg = stats["cold_seconds"] / stats["cold_calls"] if stats["cold_calls"] else None
+    warm_avg = stats["warm_seconds"] / stats["warm_calls"] if stats["warm_calls"] else None
+    return {
+        "loaded": is_loaded(name),
+        "load_seconds": stats["load_seconds"],
+        "cold_calls": stats["cold_calls"],
+        "cold_avg_seconds": round(cold_avg, 3) if cold_avg is not None else None,
+        "warm_calls": stats["warm_calls"],
+        "warm_avg_seconds": round(warm_avg, 3) if warm_avg is not None else None
+    }
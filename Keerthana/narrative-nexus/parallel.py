@@ -0,0 +1,359 @@
+import atexit
+import collections
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+
+import perf
+from collection import iter_extract_text, extract_pdf_range, pdf_page_count, CSV_CHUNK_ROWS, PAGE_TIMEOUT
+from preprocessing import preprocess_batch, preprocess_stream, pipeline_config
+from sentiment import analyze_sentiment, analyze_sentiment_batch
+
+# Parallel per-document pipeline (extract -> preprocess -> sentiment).
+# Rendering stays in the Streamlit thread; only the pure computation runs in
+# worker processes. NN_WORKERS=1 forces the serial path, except for PDFs:
+# the page timeout (SIGALRM) only works in a process's main thread, so with
+# NN_PAGE_TIMEOUT set PDFs are always extracted in the pool, even alone.
+
+DEFAULT_WORKERS = int(os.environ.get("NN_WORKERS", os.cpu_count() or 1))
+MIN_DOCS_FOR_POOL = 4   # below this, process start-up costs more than it saves
+PDF_SPLIT_PAGES = 40    # longer PDFs are extracted in page ranges across workers
+MIN_PAGES_PER_TASK = 10
+PIPELINE_VERSION = 2    # bump when process_document output changes
+
+_pools = {}    # worker count -> ProcessPoolExecutor, shared by every session
+_pool_lock = threading.Lock()
+#failures after which a batch is redone in this process; RuntimeError covers
+#submitting to a pool another caller has just discarded (and BrokenProcessPool)
+_POOL_ERRORS = (RuntimeError, CancelledError, PicklingError, OSError)
+
+
+class UploadedBytes(io.BytesIO):
+    """
+    Picklable stand-in for a Streamlit UploadedFile (name, type, bytes)
+    """
+
+    def __init__(self, data, name, type):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+
+    @classmethod
+    def from_upload(cls, file):
+        return cls(file.getvalue(), file.name, file.type)
+
+
+def _init_worker():
+    # load stopwords, WordNet and VADER once per worker instead of
+    # on the first document it receives
+    import preprocessing
+    import sentiment
+    preprocessing.load_nltk()
+    preprocessing.lemmatizer.lemmatize("documents")
+    sentiment.get_analyzer()
+
+
+def process_document(item, keep_original=True):
+    """
+    Full per-document pipeline for one (details, source) pair, where source
+    is an UploadedBytes, a plain string or a list of already extracted pieces.
+    Stage timings (perf spans) are returned in details["perf"], and PDF pages
+    that hit the page timeout in details["timed_out_pages"]. A failed
+    extraction is reported in details["error"]. With keep_original=False
+    the original text is not kept (original_text is empty).
+    """
+    details, source = item
+    timed_out = []
+    errors = []
+    with perf.capture() as spans, perf.span("process_document"):
+        if isinstance(source, str):
+            chunks = [source]
+        elif isinstance(source, list):
+            chunks = source
+        else:
+            source.seek(0)
+            chunks = perf.timed_iter("extract_text", iter_extract_text(source, timed_out=timed_out, errors=errors))
+        result = preprocess_stream(chunks, keep_original=keep_original)
+        sentiment_result = analyze_sentiment(result.processed_text)
+        result.drop("tokens")   #the cleaned text is all that is sent back
+    if timed_out:
+        details = {**details, "timed_out_pages": timed_out}
+    if errors:
+        details = {**details, "error": errors[0]}
+    if spans:
+        #stage timings travel back from the worker with the result
+        details = {**details, "perf": spans}
+    return details, result, sentiment_result
+
+
+def process_rows(texts):
+    """
+    Preprocessing and sentiment for a batch of short documents (CSV rows):
+    returns (cleaned texts, analyze_sentiment_batch columns)
+    """
+    cleaned = preprocess_batch(texts)
+    return cleaned, analyze_sentiment_batch(cleaned)
+
+
+def process_row_batches(batches, workers=DEFAULT_WORKERS):
+    """
+    process_rows over an iterable of text batches, results in order. At most
+    two batches per worker are in flight, so the rows of a large file are
+    never all loaded at once. When the pool cannot be used, the batches not
+    finished yet run here instead (as in _run).
+    """
+    if workers <= 1:
+        for texts in batches:
+            yield process_rows(texts)
+        return
+
+    try:
+        pool = get_pool(workers)
+    except OSError:
+        pool = None
+    pending = collections.deque()   #(texts, future), oldest first
+    for texts in batches:
+        future = None
+        if pool is not None:
+            try:
+                future = pool.submit(process_rows, texts)
+            except RuntimeError as e:
+                _discard_broken(pool, e)
+                pool = None
+        pending.append((texts, future))
+        while pending and (len(pending) >= 2 * workers or pool is None):
+            result, pool = _row_result(*pending.popleft(), pool)
+            yield result
+    while pending:
+        result, pool = _row_result(*pending.popleft(), pool)
+        yield result
+
+
+def _row_result(texts, future, pool):
+    """
+    (result, pool) for one batch of process_row_batches: the future's
+    result, or process_rows run here once the pool has failed (pool None)
+    """
+    if future is not None and pool is not None:
+        try:
+            return future.result(), pool
+        except _POOL_ERRORS as e:
+            _discard_broken(pool, e)
+    return process_rows(texts), None
+
+
+def get_pool(workers):
+    """
+    The shared pool with this many workers. Each worker count has its own
+    pool, so a session choosing another count never stops a pool that other
+    sessions have work queued on.
+    """
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn: forking the multi-threaded Streamlit server is unsafe
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return pool
+
+
+def _discard_broken(pool, error):
+    """
+    After a pool failure: a broken pool is forgotten (the next get_pool
+    starts a new one) and shut down. Its futures have already failed, so
+    nothing other callers queued is cancelled; a healthy pool is left alone.
+    """
+    if not isinstance(error, BrokenProcessPool):
+        return
+    with _pool_lock:
+        for workers, registered in list(_pools.items()):
+            if registered is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def shutdown_pool():
+    """
+    Stops every pool (at exit, or when a batch run is finished)
+    """
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(shutdown_pool)
+
+
+def _cache_keys(cache, details, source):
+    content = source if isinstance(source, str) else source.getvalue()
+    text_key = cache.key(content, {
+        "stage": "text",
+        "type": details["type"],
+        "csv_chunk_rows": CSV_CHUNK_ROWS,
+        "version": PIPELINE_VERSION
+    })
+    analysis_key = cache.key(content, {
+        "stage": "analysis",
+        "type": details["type"],
+        **pipeline_config(),
+        "version": PIPELINE_VERSION
+    })
+    return text_key, analysis_key
+
+
+def process_documents(items, workers=DEFAULT_WORKERS, chunksize=None, cache=None):
+    """
+    Run process_document over all items on a process pool.
+    Results are returned in the same order as items.
+    With a result_cache.ResultCache, documents seen before (same bytes, same
+    pipeline config) skip every stage, and documents whose text is cached
+    skip extraction.
+    """
+    items = list(items)
+    if cache is None:
+        return _merge_perf(_run(items, workers, chunksize))
+
+    results = [None] * len(items)
+    keys = [_cache_keys(cache, details, source) for details, source in items]
+    todo = []
+    for i, (details, source) in enumerate(items):
+        text_key, analysis_key = keys[i]
+        cached = cache.get(analysis_key)
+        if cached is not None:
+            results[i] = (details, *cached)
+            continue
+        if not isinstance(source, str):
+            text = cache.get(text_key)
+            if text is not None:
+                items[i] = (details, text)
+        todo.append(i)
+
+    for i, (details, result, sentiment_result) in zip(todo, _run([items[i] for i in todo], workers, chunksize)):
+        results[i] = (details, result, sentiment_result)
+        if "error" in details or "timed_out_pages" in details:
+            continue   #incomplete: extracted again next time rather than served from the cache
+        text_key, analysis_key = keys[i]
+        cache.set(analysis_key, (result, sentiment_result))
+        if not isinstance(items[i][1], str):
+            cache.set(text_key, result.original_text)
+
+    return _merge_perf(results)
+
+
+def _merge_perf(results):
+    """
+    Moves the worker stage timings into this thread's recording
+    """
+    recording = perf.current()
+    for details, _, _ in results:
+        spans = details.pop("perf", None)
+        if spans and recording is not None:
+            recording.merge(spans)
+    return results
+
+
+def _is_pdf(source):
+    return not isinstance(source, (str, list)) and source.type == "application/pdf"
+
+
+def _page_ranges(pages, workers):
+    """
+    Page ranges to extract in parallel for a PDF of this many pages, or None
+    when it is short enough to extract in one task
+    """
+    if pages <= PDF_SPLIT_PAGES:
+        return None
+    tasks = max(2, min(workers, pages // MIN_PAGES_PER_TASK))
+    bounds = [pages * i // tasks for i in range(tasks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _spill(source):
+    #one temp file per PDF: page-range tasks open it instead of each receiving the bytes
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="nn-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(source.getvalue())
+    return path
+
+
+def _run(items, workers, chunksize):
+    """
+    Falls back to the serial loop for small batches, workers <= 1,
+    or when the pool cannot be used; batches with a PDF use the pool
+    whenever there is a page timeout (see the note at the top).
+    With several workers, PDFs are counted in the pool (a malformed one
+    cannot hang this thread) and long ones are split into page ranges that
+    run alongside the other documents; results still come back in input order.
+    """
+    pdfs = [i for i, (_, source) in enumerate(items) if _is_pdf(source)]
+    split = pdfs if workers > 1 else []
+    if not (split or (PAGE_TIMEOUT and pdfs)) and (workers <= 1 or len(items) < MIN_DOCS_FOR_POOL):
+        return [process_document(item) for item in items]
+    workers = max(workers, 1)
+
+    whole = [i for i in range(len(items)) if i not in set(split)]
+    if chunksize is None:
+        # a few chunks per worker keeps all cores busy without per-doc IPC
+        chunksize = max(1, len(whole) // (workers * 4))
+
+    pool = None
+    paths = {}
+    try:
+        pool = get_pool(workers)
+        for i in split:
+            paths[i] = _spill(items[i][1])
+        counts = {i: pool.submit(pdf_page_count, paths[i]) for i in split}
+        mapped = pool.map(process_document, [items[i] for i in whole], chunksize=chunksize)
+
+        page_tasks, finishing = {}, {}
+        for i, count in counts.items():
+            try:
+                ranges = _page_ranges(count.result(), workers)
+            except _POOL_ERRORS:
+                raise
+            except Exception:
+                ranges = None   #unreadable: process_document reports the error
+            if ranges is None:
+                finishing[i] = pool.submit(process_document, items[i])
+            else:
+                page_tasks[i] = [pool.submit(extract_pdf_range, paths[i], start, stop) for start, stop in ranges]
+        results = dict(zip(whole, mapped))
+
+        #join each PDF's pages (in order, as iter_extract_text would) and finish it in the pool
+        for i, tasks in page_tasks.items():
+            details, source = items[i]
+            pieces, timed_out = [], []
+            if any(task.exception() is not None for task in tasks):
+                if any(isinstance(task.exception(), BrokenProcessPool) for task in tasks):
+                    raise BrokenProcessPool()
+                finishing[i] = pool.submit(process_document, (details, source))   #reports the error
+                continue
+            for task in tasks:
+                texts, late = task.result()
+                pieces.extend(texts)
+                timed_out.extend(late)
+            pieces = [("\n" if n else "") + text for n, text in enumerate(pieces)]
+            if timed_out:
+                details = {**details, "timed_out_pages": timed_out}
+            finishing[i] = pool.submit(process_document, (details, pieces))
+        results.update((i, task.result()) for i, task in finishing.items())
+        return [results[i] for i in range(len(items))]
+    except _POOL_ERRORS as e:
+        if pool is not None:
+            _discard_broken(pool, e)
+        return [process_document(item) for item in items]
+    finally:
+        for path in paths.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
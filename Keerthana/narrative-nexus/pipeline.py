@@ -0,0 +1,362 @@
+import os
+
+import perf
+from parallel import DEFAULT_WORKERS, UploadedBytes, process_document, process_documents
+
+# Analysis stages without any Streamlit calls, shared by the UI (streamlit_ui)
+# and the headless batch runner (batch.py).
+
+MIME_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "csv": "text/csv"
+}
+
+#near-duplicate documents are modelled once (see dedup.py)
+DEDUP = os.environ.get("NN_DEDUP", "1") != "0"
+
+#CSV row documents (evenly spaced) the summaries are drawn from; topics and sentiment use all rows
+SUMMARY_ROWS = 2000
+
+#stages reported by analyze_inputs / analyze_corpus through progress(stage, fraction)
+ANALYSIS_STAGES = ("documents", "topics", "summaries", "visuals")
+
+#words that contradict a document's overall sentiment when they are topic keywords
+CONFLICT_WORDS = {
+    "Positive 😊": ["bad", "problem", "fail", "error"],
+    "Negative 😠": ["good", "success", "win", "happy"]
+}
+
+
+#DOCUMENT STAGES
+
+def load_file(path):
+    """
+    Reads a file from disk into the same shape as a Streamlit upload
+    """
+    name = os.path.basename(path)
+    extension = name.rsplit(".", 1)[-1].lower()
+    with open(path, "rb") as f:
+        return UploadedBytes(f.read(), name, MIME_TYPES.get(extension, "application/octet-stream"))
+
+
+def analyze_path(path, keep_tokens=False):
+    """
+    extract_text -> preprocess_text -> analyze_sentiment for one file on disk.
+    Returns a JSON-serialisable record (the original text is left out, and
+    the token list too unless keep_tokens is True).
+    """
+    file = load_file(path)
+    details = {
+        "name": file.name,
+        "type": file.type,
+        "size_kb": round(len(file.getvalue()) / 1024, 2),
+        "extension": file.name.rsplit(".", 1)[-1]
+    }
+    details, result, sentiment_result = process_document((details, file), keep_original=False)
+
+    record = {"path": path, **details}
+    record.update(result.to_dict())
+    if keep_tokens:
+        record["tokens"] = result.tokens
+    record["sentiment"] = sentiment_result
+    return record
+
+
+def analyze_csv_rows(file, text_column, id_column=None, workers=DEFAULT_WORKERS, progress=None):
+    """
+    Every row of a CSV file as a document (see collection.iter_csv_rows):
+    rows go straight from the reader into batched preprocessing and VADER.
+    Returns {"id", "sentiment", "compound", "cleaned_text"}, one list per
+    column with one entry per non-empty row.
+    """
+    import numpy as np
+    from collection import iter_csv_rows
+    from parallel import process_row_batches
+    from sentiment import LABELS
+
+    table = {"id": [], "sentiment": [], "compound": [], "cleaned_text": []}
+    ids = []   #ids of the batches still being processed
+
+    def batches():
+        for batch_ids, texts in iter_csv_rows(file, text_column, id_column):
+            _report(progress, "documents")   #lets a cancelled job stop between batches
+            ids.append(batch_ids)
+            yield texts
+
+    for cleaned, scores in process_row_batches(batches(), workers):
+        table["id"].extend(ids.pop(0))
+        table["cleaned_text"].extend(cleaned)
+        table["compound"].extend(scores["compound"].tolist())
+        table["sentiment"].extend(LABELS[int(code)] for code in np.asarray(scores["label"]))
+    return table
+
+
+def _report(progress, stage, fraction=0.0):
+    if progress is not None:
+        progress(stage, fraction)
+
+
+#CORPUS STAGES
+
+def overall_sentiment(compound_scores):
+    avg_sentiment = sum(compound_scores) / len(compound_scores) if compound_scores else 0
+    return (
+        "Positive 😊" if avg_sentiment >= 0.05 else
+        "Negative 😠" if avg_sentiment <= -0.05 else
+        "Neutral 😐"
+    )
+
+
+def sentiment_distribution(compound_scores):
+    return {
+        "positive": sum(1 for s in compound_scores if s > 0.05),
+        "negative": sum(1 for s in compound_scores if s < -0.05),
+        "neutral": sum(1 for s in compound_scores if -0.05 <= s <= 0.05),
+        "total": len(compound_scores)
+    }
+
+
+def topic_sentiments(lda_topics, matrices, docs):
+    """
+    Average compound score per topic, each document weighted by its share of
+    the topic (doc_topic.T @ scores). docs: dicts with "compound_score",
+    one per row of the matrices (see topic_model), and optionally "weight"
+    (the number of documents it stands for, see deduplicate_docs)
+    """
+    import numpy as np
+
+    if matrices is None:
+        return []
+    counts = np.array([item.get("weight", 1) for item in docs], dtype=np.float64)
+    doc_topic = matrices["doc_topic"] * counts[:, None]
+    scores = np.array([item["compound_score"] for item in docs], dtype=np.float64)
+    weights = doc_topic.sum(axis=0)
+    avg = (doc_topic.T @ scores) / np.where(weights > 0, weights, 1)
+    return [{"topic": topic["topic"], "avg_sentiment": float(score)} for topic, score in zip(lda_topics, avg)]
+
+
+def sentiment_conflicts(matrices, docs):
+    """
+    Names of documents whose sentiment conflicts with a topic keyword they
+    contain. Keywords are matched as whole terms through the doc-term matrix.
+    docs: dicts with "name" and "sentiment", one per row of the matrices
+    """
+    import numpy as np
+
+    if matrices is None:
+        return []
+    doc_term = matrices["doc_term"].tocsc()
+    labels = np.array([item["sentiment"] for item in docs], dtype=object)
+    flagged = np.zeros(doc_term.shape[0], dtype=bool)
+
+    for sentiment, words in CONFLICT_WORDS.items():
+        columns = sorted({
+            column
+            for topic_columns, topic_words in zip(matrices["top_terms"], matrices["top_words"])
+            for column, word in zip(topic_columns, topic_words) if word in words
+        })
+        if columns:
+            contains = np.asarray(doc_term[:, columns].sum(axis=1)).ravel() > 0
+            flagged |= contains & (labels == sentiment)
+
+    return [docs[i]["name"] for i in np.flatnonzero(flagged)]
+
+
+def deduplicate_docs(docs):
+    """
+    One document per near-duplicate cluster (see dedup.py), in input order.
+    Each representative gets "weight" (its cluster size) and the cluster's
+    mean "compound_score". Returns (representatives, duplicates), duplicates
+    being [{"name", "duplicate_of"}] for every document that was dropped.
+    """
+    import numpy as np
+    from dedup import deduplicate
+
+    representatives, counts, labels = deduplicate([item["cleaned_text"] for item in docs])
+    scores = np.bincount(labels, weights=[item["compound_score"] for item in docs], minlength=len(docs))
+    kept = [
+        {**docs[i], "weight": int(count), "compound_score": float(scores[i] / count)}
+        for i, count in zip(representatives, counts)
+    ]
+    duplicates = [
+        {"name": docs[i]["name"], "duplicate_of": docs[label]["name"]}
+        for i, label in enumerate(labels) if label != i
+    ]
+    return kept, duplicates
+
+
+def topic_model(processed_texts, num_topics=5, incremental=False, store=None, rows=None):
+    """
+    Returns (lda_topics, sweep, matrices). sweep lists the scored K values
+    when num_topics is "auto" (see model.lda_topic_sweep), otherwise it is
+    empty. matrices (see model._matrices) has one row per processed text, or
+    is None when there are too few texts for a model.
+    The incremental model keeps a fixed K (5 for "auto").
+    With a corpus_store.CorpusStore, the doc-term matrix is built from its
+    token ids instead (rows: the store rows of processed_texts, in order).
+    """
+    from model import lda_topic_model, lda_topic_sweep, update_topic_model, store_doc_term, store_topic_model
+
+    if incremental and processed_texts:
+        k = 5 if num_topics == "auto" else num_topics
+        lda_topics, matrices = update_topic_model(processed_texts, num_topics=k, return_matrices=True)
+        return lda_topics, [], matrices
+    if len(processed_texts) < 2:
+        return [], [], None
+    if num_topics == "auto":
+        doc_term = store_doc_term(store, rows) if store is not None else None
+        best_k, sweep = lda_topic_sweep(processed_texts, return_matrices=True, doc_term=doc_term)
+        best = next(row for row in sweep if row["k"] == best_k)
+        return best["topics"], sweep, best.pop("matrices")
+    if store is not None:
+        lda_topics, matrices = store_topic_model(store, num_topics=num_topics, rows=rows, return_matrices=True)
+        return lda_topics, [], matrices
+    lda_topics, matrices = lda_topic_model(processed_texts, num_topics=num_topics, return_matrices=True)
+    return lda_topics, [], matrices
+
+
+def _summary_sample(docs, limit=SUMMARY_ROWS):
+    """
+    Every whole document, and at most limit of the CSV row documents
+    """
+    rows = [i for i, item in enumerate(docs) if item.get("csv_row")]
+    if len(rows) <= limit:
+        return docs
+    keep = set(rows[::-(-len(rows) // limit)])
+    return [item for i, item in enumerate(docs) if i in keep or not item.get("csv_row")]
+
+
+def analyze_corpus(docs, num_topics=5, summary_method="frequency", abstractive=False, incremental=False, store=None,
+                   dedup=DEDUP, progress=None):
+    """
+    Corpus-level results for the per-document outputs (same stages as render_ui).
+    docs: dicts with "name", "cleaned_text", "sentiment" and "compound_score"
+    (and "store_row", their row in store, when a CorpusStore is given,
+    "original_text", which the abstractive summary reads when present, and
+    "csv_row" for CSV row documents, of which the summaries see SUMMARY_ROWS)
+    With dedup, near-duplicates are dropped before topic modelling and
+    summarization; the sentiment distribution still counts every document.
+    """
+    from summarization import extractive_summary, abstractive_summary
+    from insights import generate_insights
+
+    modelled = [item for item in docs if item.get("cleaned_text")]
+    duplicates = []
+    if dedup and len(modelled) > 1:
+        _report(progress, "topics")
+        modelled, duplicates = deduplicate_docs(modelled)
+    processed_texts = [item["cleaned_text"] for item in modelled]
+    scores = [item["compound_score"] for item in docs]
+
+    rows = [item["store_row"] for item in modelled] if store is not None else None
+    _report(progress, "topics")
+    lda_topics, sweep, matrices = topic_model(processed_texts, num_topics, incremental, store, rows)
+
+    sentiment = overall_sentiment(scores)
+    summarized = _summary_sample(modelled)
+    combined_text = " ".join(item["cleaned_text"] for item in summarized)
+
+    _report(progress, "summaries")
+    extractive = extractive_summary(combined_text, method=summary_method)
+    abstract = ""
+    if abstractive:
+        #the whole corpus, map-reduced; original texts keep their sentence boundaries
+        source = " ".join(item.get("original_text") or item["cleaned_text"] for item in summarized)
+        try:
+            abstract = abstractive_summary(
+                source, progress=None if progress is None else lambda f: progress("summaries", f)
+            )
+        except Exception as e:
+            abstract = f"ERROR: {e}"
+
+    return {
+        "documents": len(docs),
+        "duplicates": duplicates,
+        "overall_sentiment": sentiment,
+        "sentiment_distribution": sentiment_distribution(scores),
+        "lda_topics": lda_topics,
+        "topic_sweep": [{k: v for k, v in row.items() if k != "topics"} for row in sweep],
+        "topic_sentiments": topic_sentiments(lda_topics, matrices, modelled),
+        "sentiment_conflicts": sentiment_conflicts(matrices, modelled),
+        "extractive": extractive,
+        "abstractive": abstract,
+        "insights": generate_insights(lda_topics, sentiment)
+    }
+
+
+def analyze_inputs(items, workers=DEFAULT_WORKERS, cache=None, num_topics=5, summary_method="frequency",
+                   incremental=False, dedup=DEDUP, progress=None):
+    """
+    Everything render_ui shows for a list of (details, source) inputs, with
+    no Streamlit calls, so it can run as a background job (see jobs.py).
+    progress(stage, fraction) is called between steps (ANALYSIS_STAGES).
+    CSV files whose details carry "csv_rows" ({"text_column", "id_column"})
+    are read row by row (analyze_csv_rows) and every row is a document.
+    Returns {"documents": [(details, result, sentiment_result)],
+    "row_tables": [(details, analyze_csv_rows(...))], "docs": [...],
+    "corpus": analyze_corpus(...), "wordcloud_png": bytes or None}
+    """
+    from visualization import term_frequencies
+
+    row_items = [item for item in items if item[0].get("csv_rows")]
+    items = [item for item in items if not item[0].get("csv_rows")]
+
+    #a few documents per worker at a time, so progress moves and cancelling stops early
+    step = max(1, workers) * 4
+    documents = []
+    for start in range(0, len(items), step):
+        _report(progress, "documents", start / (len(items) + len(row_items)))
+        documents.extend(process_documents(items[start:start + step], workers=workers, cache=cache))
+
+    row_tables = []
+    for n, (details, source) in enumerate(row_items):
+        done = (len(items) + n) / (len(items) + len(row_items))
+        _report(progress, "documents", done)
+        #the number of rows is not known up front: progress stays at this file while it is read
+        file_progress = None if progress is None else lambda stage, fraction=0.0, done=done: progress(stage, done)
+        row_tables.append((details, analyze_csv_rows(source, **details["csv_rows"], workers=workers, progress=file_progress)))
+
+    docs = [
+        {
+            "name": details["name"],
+            "cleaned_text": result.processed_text,
+            "sentiment": sentiment_result["sentiment"],
+            "compound_score": sentiment_result["compound"]
+        }
+        for details, result, sentiment_result in documents
+    ]
+    with_text = [
+        {**item, "original_text": result.original_text}
+        for item, (_, result, _) in zip(docs, documents)
+    ]
+    for details, table in row_tables:
+        rows = [
+            {
+                "name": f"{details['name']}#{row_id}", "cleaned_text": text, "sentiment": sentiment,
+                "compound_score": score, "csv_row": True
+            }
+            for row_id, text, sentiment, score in zip(table["id"], table["cleaned_text"], table["sentiment"], table["compound"])
+        ]
+        docs.extend(rows)
+        with_text.extend(rows)
+    corpus = analyze_corpus(
+        with_text, num_topics, summary_method, abstractive=True, incremental=incremental, dedup=dedup, progress=progress
+    )
+
+    _report(progress, "visuals")
+    frequencies = term_frequencies(" ".join(item["cleaned_text"] for item in docs))
+    return {
+        "documents": documents,
+        "row_tables": row_tables,
+        "docs": docs,
+        "corpus": corpus,
+        "wordcloud_png": _wordcloud(frequencies)
+    }
+
+
+@perf.timed("wordcloud")
+def _wordcloud(frequencies):
+    from visualization import wordcloud_png
+    return wordcloud_png(frequencies) if frequencies else None
@@ -1,21 +1,94 @@
-import nltk #natural lang toolkit(used fr text processing n tokenization)
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import hashlib
+import re
+from functools import lru_cache
 from cleaning import clean_text
+from document import Document
+import resources
+import perf
 
-#Downloads
-nltk.download("punkt")
-nltk.download("wordnet")
-nltk.download("stopwords")
+#NLTK (natural lang toolkit) is slow to import, so it is loaded on first use
+stop_words = None
+lemmatizer = None
 
-stop_words = set(stopwords.words("english"))
-lemmatizer = WordNetLemmatizer()
+#Fast path constants
+LEMMA_CACHE_SIZE = 200000
+#bytes kept by clean_text on ASCII input: a-z and whitespace (after lowercasing)
+_KEEP_ASCII = set(b"abcdefghijklmnopqrstuvwxyz") | {b for b in range(128) if chr(b).isspace()}
+_DELETE_ASCII = bytes(b for b in range(256) if b not in _KEEP_ASCII)
+_NON_ALPHA = re.compile(r"[^a-z\s]+")
+#the only words the Treebank tokenizer splits once text is letters + spaces
+_TREEBANK_SPLITS = {
+    "cannot": ["can", "not"],
+    "gimme": ["gim", "me"],
+    "gonna": ["gon", "na"],
+    "gotta": ["got", "ta"],
+    "lemme": ["lem", "me"],
+    "wanna": ["wan", "na"]
+}
 
-def preprocess_text(text):
+def load_nltk():
+    """
+    Loads stopwords + WordNet lemmatizer from local NLTK data (no downloads)
+    """
+    global stop_words, lemmatizer
+    if lemmatizer is None:
+        resources.require("stopwords", "wordnet")
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        stop_words = set(stopwords.words("english"))
+        lemmatizer = WordNetLemmatizer()
 
-    #Original stats
-    original_words = len(text.split())
-    original_chars = len(text)
+
+def pipeline_config():
+    """
+    Settings that change the output of preprocess_text (used in cache keys)
+    """
+    load_nltk()
+    return {
+        "stopwords": hashlib.sha1(" ".join(sorted(stop_words)).encode("utf-8")).hexdigest(),
+        "lemmatizer": type(lemmatizer).__name__
+    }
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _lemmatize(token):
+    return lemmatizer.lemmatize(token)
+
+
+def _clean_split(text):
+    """
+    clean_text + tokenization fused: ASCII text is lowercased and stripped
+    with bytes.translate in one C pass, then split on whitespace
+    """
+    if text.isascii():
+        return text.encode("ascii").lower().translate(None, _DELETE_ASCII).decode("ascii").split()
+    return _NON_ALPHA.sub("", text.lower()).split()
+
+
+def _process_tokens(text):
+    """
+    Fast path, same output as _process_tokens_nltk: each distinct word is
+    stopword-checked and lemmatized once per call (and memoized across calls)
+    """
+    load_nltk()
+    tokens = _clean_split(text)
+    unique = set(tokens)
+
+    if not unique.isdisjoint(_TREEBANK_SPLITS):
+        tokens = [part for t in tokens for part in _TREEBANK_SPLITS.get(t, (t,))]
+        unique = set(tokens)
+
+    lemmas = {t: _lemmatize(t) for t in unique - stop_words}
+    return [lemmas[t] for t in tokens if t in lemmas]
+
+
+def _process_tokens_nltk(text):
+    """
+    Reference implementation (Treebank tokenizer, no memoization)
+    """
+    import nltk
+    resources.require("punkt")
+    load_nltk()
 
     #Cleaning
     cleaned = clean_text(text)
@@ -27,27 +100,43 @@ def preprocess_text(text):
     tokens = [t for t in tokens if t not in stop_words]
 
     #Lemmatization
-    tokens = [lemmatizer.lemmatize(t) for t in tokens]
+    return [lemmatizer.lemmatize(t) for t in tokens]
 
-    #Final processed text
-    processed_text = " ".join(tokens)
 
-    #Cleaned stats
-    cleaned_words = len(tokens)
-    cleaned_chars = len(processed_text)
+def preprocess_text(text):
+    return preprocess_stream([text])
 
-    #Reduction %
-    word_reduction = round(((original_words - cleaned_words)/original_words)*100,2) if original_words else 0
-    char_reduction = round(((original_chars - cleaned_chars)/original_chars)*100,2) if original_chars else 0
 
-    return {
-        "original_text": text,
-        "processed_text": processed_text,
-        "original_words": original_words,
-        "original_chars": original_chars,
-        "cleaned_words": cleaned_words,
-        "cleaned_chars": cleaned_chars,
-        "word_reduction": word_reduction,
-        "char_reduction": char_reduction,
-        "tokens": tokens
-    }
+@perf.timed("preprocess_text")
+def preprocess_batch(texts):
+    """
+    Cleaned text of each of many short documents (e.g. CSV rows), without
+    building a Document per text
+    """
+    return [" ".join(_process_tokens(text)) for text in texts]
+
+
+@perf.timed("preprocess_text")
+def preprocess_stream(chunks, keep_original=True):
+    """
+    Preprocess text arriving in pieces (see collection.iter_extract_text).
+    Only one piece is cleaned/tokenized at a time; the original text is only
+    kept when keep_original is True (otherwise original_text is empty).
+    Returns a document.Document.
+    """
+
+    #Original stats
+    original_words = 0
+    original_chars = 0
+    original_parts = []
+    tokens = []
+
+    for chunk in chunks:
+        original_words += len(chunk.split())
+        original_chars += len(chunk)
+        if keep_original:
+            original_parts.append(chunk)
+        tokens.extend(_process_tokens(chunk))
+
+    #cleaned text, cleaned stats and reductions are derived from tokens on use
+    return Document("".join(original_parts), original_words, original_chars, tokens=tokens)
@@ -1,6 +1,124 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+import io
 from datetime import datetime
+import perf
+
+#PDF REPORT
+# Built in memory (one BytesIO per call, nothing shared between sessions).
+# Text is wrapped to the page width and new pages are started as needed;
+# each section is capped so huge inputs still build in bounded time.
+
+MARGIN = 40
+MAX_SECTION_CHARS = 100000
+MAX_TOPICS = 5000
+
+
+class _PageWriter:
+    """
+    Draws lines top-down on a reportlab canvas, starting a new page when full
+    """
+
+    def __init__(self, c, width, height):
+        self.c = c
+        self.width = width
+        self.height = height
+        self.y = height - MARGIN
+
+    def space(self, needed):
+        if self.y - needed < MARGIN:
+            self.c.showPage()
+            self.y = self.height - MARGIN
+
+    def text(self, text, font="Helvetica", size=10, indent=0, gap=4):
+        from reportlab.lib.utils import simpleSplit
+
+        leading = size + gap
+        max_width = self.width - 2 * MARGIN - indent
+        for paragraph in text[:MAX_SECTION_CHARS].splitlines() or [""]:
+            for line in simpleSplit(paragraph, font, size, max_width) or [""]:
+                self.space(leading)
+                self.c.setFont(font, size)
+                self.c.drawString(MARGIN + indent, self.y - size, line)
+                self.y -= leading
+
+    def heading(self, text, size=12):
+        self.y -= 12
+        self.space(size + 30)   #keep headings with their first line
+        self.text(text, font="Helvetica-Bold", size=size, gap=8)
+
+    def image(self, png, max_height=220):
+        from reportlab.lib.utils import ImageReader
+
+        reader = ImageReader(io.BytesIO(png))
+        w, h = reader.getSize()
+        scale = min((self.width - 2 * MARGIN) / w, max_height / h, 1)
+        self.space(h * scale + 10)
+        self.c.drawImage(reader, MARGIN, self.y - h * scale, w * scale, h * scale)
+        self.y -= h * scale + 10
+
+    def bars(self, counts, bar_height=14):
+        """
+        Horizontal bar chart of {label: count}
+        """
+        total = max(sum(counts.values()), 1)
+        max_width = self.width - 2 * MARGIN - 160
+        for label, count in counts.items():
+            self.space(bar_height + 6)
+            self.c.setFont("Helvetica", 10)
+            self.c.drawString(MARGIN + 20, self.y - bar_height + 3, label)
+            self.c.rect(MARGIN + 100, self.y - bar_height, max_width * count / total, bar_height - 2, stroke=0, fill=1)
+            self.c.drawString(MARGIN + 106 + max_width * count / total, self.y - bar_height + 3, f"{count} ({count / total * 100:.1f}%)")
+            self.y -= bar_height + 6
+
+
+@perf.timed("generate_pdf_report")
+def build_pdf_report(
+    overall_sentiment,
+    lda_topics,
+    extractive_summary,
+    abstractive_summary,
+    wordcloud_png=None,
+    sentiment_counts=None
+):
+    """
+    Returns the report as PDF bytes. wordcloud_png (PNG bytes) and
+    sentiment_counts ({"Positive": n, ...}) are optional.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    page = _PageWriter(c, *A4)
+
+    page.text("NarrativeNexus - Analysis Report", font="Helvetica-Bold", size=16, gap=14)
+    page.text(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    page.heading("Overall Sentiment:")
+    page.text(overall_sentiment, size=11, indent=20)
+
+    if sentiment_counts:
+        page.heading("Sentiment Distribution:")
+        page.bars(sentiment_counts)
+
+    page.heading("Topic Modeling Results:")
+    for topic in lda_topics[:MAX_TOPICS]:
+        page.text(f"{topic['topic']}: {topic['words']}", indent=20, gap=5)
+    if len(lda_topics) > MAX_TOPICS:
+        page.text(f"... {len(lda_topics) - MAX_TOPICS} more topics", indent=20)
+
+    if wordcloud_png:
+        page.heading("Word Cloud:")
+        page.image(wordcloud_png)
+
+    page.heading("Extractive Summary:")
+    page.text(extractive_summary, indent=20)
+
+    page.heading("Abstractive Summary:")
+    page.text(abstractive_summary, indent=20)
+
+    c.save()
+    return buf.getvalue()
+
 
 def generate_pdf_report(
     filename,
@@ -9,50 +127,9 @@ def generate_pdf_report(
     extractive_summary,
     abstractive_summary
 ):
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
-
-    y = height - 40
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, y, "NarrativeNexus - Analysis Report")
-
-    y -= 30
-    c.setFont("Helvetica", 10)
-    c.drawString(40, y, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-    y -= 40
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y, "Overall Sentiment:")
-    y -= 20
-    c.setFont("Helvetica", 11)
-    c.drawString(60, y, overall_sentiment)
-
-    y -= 40
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y, "Topic Modeling Results:")
-    y -= 20
-
-    c.setFont("Helvetica", 10)
-    for topic in lda_topics:
-        c.drawString(60, y, f"{topic['topic']}: {topic['words']}")
-        y -= 15
-        if y < 80:
-            c.showPage()
-            y = height - 40
-
-    y -= 20
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y, "Extractive Summary:")
-    y -= 20
-    c.setFont("Helvetica", 10)
-    c.drawString(60, y, extractive_summary[:500])
-
-    y -= 60
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y, "Abstractive Summary:")
-    y -= 20
-    c.setFont("Helvetica", 10)
-    c.drawString(60, y, abstractive_summary[:500])
-
-    c.save()
+    """
+    Writes the report to filename (see build_pdf_report)
+    """
+    pdf = build_pdf_report(overall_sentiment, lda_topics, extractive_summary, abstractive_summary)
+    with open(filename, "wb") as f:
+        f.write(pdf)
@@ -0,0 +1,55 @@
+import os
+
+# Offline resource bootstrap.
+# NLTK data is looked up in the local nltk_data paths only; nothing is
+# downloaded unless NN_NLTK_DOWNLOAD=1 is set. To prepare an air-gapped
+# machine, run once where there is network access:
+#   python -m nltk.downloader -d /path/to/nltk_data punkt_tab wordnet stopwords vader_lexicon
+# and point NLTK_DATA at that directory.
+
+# resource -> paths inside nltk_data (any one of them is enough)
+NLTK_RESOURCES = {
+    "punkt": ["tokenizers/punkt_tab/english/", "tokenizers/punkt/english.pickle"],
+    "wordnet": ["corpora/wordnet"],
+    "stopwords": ["corpora/stopwords"],
+    "vader_lexicon": ["sentiment/vader_lexicon.zip"]
+}
+
+ALLOW_DOWNLOAD = os.environ.get("NN_NLTK_DOWNLOAD") == "1"
+
+_available = set()
+
+
+def has_resource(name):
+    import nltk
+
+    for path in NLTK_RESOURCES[name]:
+        try:
+            nltk.data.find(path)
+            return True
+        except LookupError:
+            continue
+    return False
+
+
+def require(*names):
+    """
+    Check that NLTK resources exist locally (once per process).
+    Raises LookupError naming the missing resources instead of downloading.
+    """
+    missing = [name for name in names if name not in _available and not has_resource(name)]
+
+    if missing and ALLOW_DOWNLOAD:
+        import nltk
+        for name in missing:
+            nltk.download("punkt_tab" if name == "punkt" else name, quiet=True)
+        missing = [name for name in missing if not has_resource(name)]
+
+    if missing:
+        raise LookupError(
+            f"NLTK data not found: {', '.join(missing)}. "
+            f"Install it with `python -m nltk.downloader {' '.join(missing)}` "
+            "(or set NLTK_DATA to a directory that has it)."
+        )
+
+    _available.update(names)
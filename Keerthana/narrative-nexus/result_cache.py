@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+# Content-addressed result cache on local disk.
+# Keys are sha256(content bytes + pipeline config), so re-uploading the same
+# file with the same settings hits the cache while any config change misses.
+# Entries are pickles; file mtime is the LRU clock (touched on every hit) and
+# the oldest entries are evicted once the directory grows past max_bytes. The
+# size is kept as a running total, so only an eviction scans the directory.
+
+CACHE_DIR = os.environ.get(
+    "NN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nn_cache")
+)
+MAX_CACHE_BYTES = int(os.environ.get("NN_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+class ResultCache:
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None   # running size of the entries, counted on the first set
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(content, config):
+        """
+        content: bytes or str, config: JSON-serialisable dict
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        h = hashlib.sha256()
+        h.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        h.update(b"\0")
+        h.update(content)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass            # evicted meanwhile: the value read is still good
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)  # atomic: readers never see half-written entries
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._bytes += size - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries) if total > self.max_bytes else ():
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+        with self._lock:
+            self._bytes = total
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = None
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size_mb": round(sum(size for _, size, _ in entries) / (1024 * 1024), 2)
+        }
+
+
+_default_cache = None
+
+def get_cache():
+    """
+    Process-wide cache instance (shared by all Streamlit sessions)
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -1,18 +1,29 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import numpy as np
+import perf
+import resources
 
-# Download VADER lexicon
-nltk.download("vader_lexicon")
+# VADER analyzer, created on first use (NLTK import + lexicon parsing are slow)
+sia = None
 
-sia = SentimentIntensityAnalyzer()
+def get_analyzer():
+    global sia
+    if sia is None:
+        resources.require("vader_lexicon")
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        sia = SentimentIntensityAnalyzer()
+    return sia
 
+# label codes used by analyze_sentiment_batch
+LABELS = {1: "Positive 😊", 0: "Neutral 😐", -1: "Negative 😠"}
+
+@perf.timed()
 def analyze_sentiment(text):
     """
     Performs sentiment analysis using VADER
     Returns sentiment label + scores
     """
 
-    scores = sia.polarity_scores(text)
+    scores = get_analyzer().polarity_scores(text)
     compound = scores["compound"]
 
     if compound >= 0.05:
@@ -29,3 +40,35 @@ def analyze_sentiment(text):
         "negative": scores["neg"],
         "compound": compound
     }
+
+
+def _score_block(texts):
+    sia = get_analyzer()
+    scores = np.empty((len(texts), 4), dtype=np.float64)
+    for i, text in enumerate(texts):
+        s = sia.polarity_scores(text)
+        scores[i] = (s["pos"], s["neu"], s["neg"], s["compound"])
+    return scores
+
+
+@perf.timed()
+def analyze_sentiment_batch(texts):
+    """
+    VADER scores for many documents with one shared analyzer.
+    Returns columns instead of per-document dicts:
+    "positive", "neutral", "negative", "compound" (float arrays) and
+    "label" (int8 codes, see LABELS). Runs in the calling process; large
+    inputs are spread over workers a batch at a time (parallel.process_row_batches).
+    """
+    scores = _score_block(list(texts))
+
+    compound = scores[:, 3]
+    label = np.where(compound >= 0.05, 1, np.where(compound <= -0.05, -1, 0)).astype(np.int8)
+
+    return {
+        "positive": scores[:, 0],
+        "neutral": scores[:, 1],
+        "negative": scores[:, 2],
+        "compound": compound,
+        "label": label
+    }
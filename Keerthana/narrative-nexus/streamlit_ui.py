@@ -1,14 +1,249 @@
+import uuid
 import streamlit as st
-from collection import extract_text, get_file_details
-from preprocessing import preprocess_text
-from model import lda_topic_model
+from collection import csv_columns, get_file_details
+from parallel import UploadedBytes, DEFAULT_WORKERS
+from result_cache import get_cache
+from jobs import get_jobs
+from model import reset_topic_state
 from css import load_css
-from sentiment import analyze_sentiment
-from summarization import extractive_summary, abstractive_summary
-from insights import generate_insights
-from visualization import show_wordcloud, show_sentiment_chart
-from reporting import generate_pdf_report
+from summarization import warm_up_summarizer, unload_summarizer, summarizer_latency
+from pipeline import ANALYSIS_STAGES, DEDUP, analyze_inputs
+from visualization import show_sentiment_chart
+from reporting import build_pdf_report
+from text_preview import text_preview
 import pandas as pd
+import perf
+
+ROW_PREVIEW = 1000   #rows of a long table (CSV rows, flagged documents) shown on the page
+
+
+def _render_row_table(details, table, key):
+    """
+    Per-row results of a CSV read with one document per row
+    """
+    st.markdown(f"<div class='file-title'>📑 {details['name']} ({len(table['id']):,} row documents)</div>", unsafe_allow_html=True)
+
+    sentiments = table["sentiment"]
+    col1, col2, col3 = st.columns(3)
+    col1.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiments.count('Positive 😊'):,}</div><div class='stat-label'>Positive Rows</div></div>", unsafe_allow_html=True)
+    col2.markdown(f"<div class='stat-card purple'><div class='stat-number'>{sentiments.count('Neutral 😐'):,}</div><div class='stat-label'>Neutral Rows</div></div>", unsafe_allow_html=True)
+    col3.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiments.count('Negative 😠'):,}</div><div class='stat-label'>Negative Rows</div></div>", unsafe_allow_html=True)
+
+    st.dataframe(pd.DataFrame({column: values[:ROW_PREVIEW] for column, values in table.items()}), hide_index=True)
+    if len(table["id"]) > ROW_PREVIEW:
+        st.caption(f"First {ROW_PREVIEW:,} rows; the download has all of them.")
+    #the CSV is only built when the button is clicked
+    st.download_button(
+        label="💾 Download Row Results CSV", data=lambda: pd.DataFrame(table).to_csv(index=False).encode("utf-8"),
+        file_name=f"{details['name'].rsplit('.', 1)[0]}_rows.csv", mime="text/csv", key=f"{key}_download"
+    )
+
+
+def _render_document(details, result, sentiment_result, key):
+
+    # File title card
+    st.markdown(f"<div class='file-title'>📄 {details['name']}</div>", unsafe_allow_html=True)
+
+    with st.container():
+        colA, colB, colC = st.columns([1.5, 1, 1])
+        colA.markdown("**File Type:** " + details['type'])
+        colB.markdown(f"**Size:** {details['size_kb']} KB")
+        colC.markdown("**Extension:** " + details['extension'])
+
+    if details.get("timed_out_pages"):
+        st.warning(f"⚠ Skipped {len(details['timed_out_pages'])} PDF page(s) that took too long to read: {details['timed_out_pages'][:20]}")
+
+    # Statistics
+    st.markdown("<h3 class='section-title'>📊 Text Statistics</h3>", unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.markdown(f"<div class='stat-card blue'><div class='stat-number'>{result.original_words}</div><div class='stat-label'>Original Words</div></div>", unsafe_allow_html=True)
+    col2.markdown(f"<div class='stat-card purple'><div class='stat-number'>{result.original_chars}</div><div class='stat-label'>Original Characters</div></div>", unsafe_allow_html=True)
+    col3.markdown(f"<div class='stat-card blue'><div class='stat-number'>{result.cleaned_words}</div><div class='stat-label'>Cleaned Words</div></div>", unsafe_allow_html=True)
+    col4.markdown(f"<div class='stat-card purple'><div class='stat-number'>{result.cleaned_chars}</div><div class='stat-label'>Cleaned Characters</div></div>", unsafe_allow_html=True)
+
+    # Reduction Stats
+    st.markdown("<br>", unsafe_allow_html=True)
+    colr1, colr2 = st.columns(2)
+    colr1.markdown(f"<div class='reduce-card'>Word Reduction: {result.word_reduction}%</div>", unsafe_allow_html=True)
+    colr2.markdown(f"<div class='reduce-card'>Character Reduction: {result.char_reduction}%</div>", unsafe_allow_html=True)
+
+    # Text Comparison
+    st.markdown("<h3 class='section-title'>🔍 Text Comparison</h3>", unsafe_allow_html=True)
+    colA, colB = st.columns(2)
+    colA.markdown("<div class='text-box-title'>⛔ Original Text</div>", unsafe_allow_html=True)
+    with colA:
+        text_preview(result.original_text, f"{key}_original")
+    colB.markdown("<div class='text-box-title'>✔ Cleaned Text</div>", unsafe_allow_html=True)
+    with colB:
+        text_preview(result.processed_text, f"{key}_cleaned")
+
+    # SENTIMENT ANALYSIS
+    st.markdown("<h3 class='section-title'>😊 Sentiment Analysis</h3>", unsafe_allow_html=True)
+    colS1, colS2, colS3, colS4 = st.columns(4)
+    colS1.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiment_result['positive']}</div><div class='stat-label'>Positive</div></div>", unsafe_allow_html=True)
+    colS2.markdown(f"<div class='stat-card purple'><div class='stat-number'>{sentiment_result['neutral']}</div><div class='stat-label'>Neutral</div></div>", unsafe_allow_html=True)
+    colS3.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiment_result['negative']}</div><div class='stat-label'>Negative</div></div>", unsafe_allow_html=True)
+    colS4.markdown(f"<div class='stat-card purple'><div class='stat-number'>{sentiment_result['compound']}</div><div class='stat-label'>Compound Score</div></div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='reduce-card'>Overall Sentiment: <b>{sentiment_result['sentiment']}</b></div>", unsafe_allow_html=True)
+
+    if abs(sentiment_result["compound"]) < 0.05:
+        st.info("ℹ Sentiment confidence is low (near neutral).")
+
+
+@st.fragment(run_every=1.0)
+def _job_progress(job_id):
+    """
+    Progress of a running analysis; reruns the whole page once it finishes
+    """
+    job = get_jobs().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    label = "cancelling…" if job.cancel_requested else (job.stage or job.status)
+    st.progress(job.progress, text=f"⏳ Analysis running: {label} ({job.elapsed:.0f}s)")
+    if st.button("✖ Cancel analysis"):
+        job.cancel()
+
+
+def _store_results(job):
+    """
+    Report inputs and stage timings from a finished analysis (once per job)
+    """
+    corpus = job.result["corpus"]
+    distribution = corpus["sentiment_distribution"]
+    st.session_state.overall_sentiment = corpus["overall_sentiment"]
+    st.session_state.lda_topics = corpus["lda_topics"]
+    st.session_state.extractive = corpus["extractive"]
+    st.session_state.abstractive = "" if corpus["abstractive"].startswith("ERROR:") else corpus["abstractive"]
+    st.session_state.sentiment_counts = {
+        "Positive": distribution["positive"], "Neutral": distribution["neutral"], "Negative": distribution["negative"]
+    }
+    st.session_state.wordcloud_png = job.result["wordcloud_png"]
+    st.session_state.report_pdf = None   #new analysis: old report is stale
+    if job.recording is not None and job.recording.spans:
+        st.session_state.perf = job.recording
+        perf.export(job.recording)
+    st.session_state.shown_job = job.id
+
+
+def _render_results(results):
+    """
+    Renders a finished analysis (see pipeline.analyze_inputs)
+    """
+    for i, (details, result, sentiment_result) in enumerate(results["documents"]):
+        _render_document(details, result, sentiment_result, f"doc{i}")
+    for i, (details, table) in enumerate(results.get("row_tables", [])):
+        _render_row_table(details, table, f"rows{i}")
+
+    download_list = results["docs"]
+    corpus = results["corpus"]
+    if not download_list:
+        st.warning("No data available for sentiment summary.")
+        return
+
+    # DOWNLOAD CSV (whole documents, which come first; CSV rows have their own download)
+    file_docs = download_list[:len(results["documents"])]
+    if file_docs:
+        st.download_button(
+            label="💾 Download Cleaned Text CSV", data=lambda: pd.DataFrame(file_docs).to_csv(index=False).encode('utf-8'),
+            file_name="cleaned_output.csv", mime="text/csv", use_container_width=True
+        )
+    st.success("✔ Analysis Completed successfully!")
+
+    # NEAR-DUPLICATES
+    duplicates = corpus.get("duplicates", [])
+    if duplicates:
+        st.info(f"🧬 {len(duplicates)} near-duplicate document(s) were modelled once, through the document they duplicate.")
+        with st.expander("Near-duplicate documents"):
+            st.dataframe(pd.DataFrame(duplicates), hide_index=True)
+
+    # LDA TOPIC MODELING
+    st.markdown("## 🧠 Topic Modeling (LDA)")
+    lda_topics = corpus["lda_topics"]
+    sweep = corpus["topic_sweep"]
+
+    if sweep:
+        best = max(sweep, key=lambda row: row["score"])
+        st.caption(f"Auto-selected {best['k']} topics (perplexity + NPMI coherence)")
+        with st.expander("Topic count sweep"):
+            st.dataframe(pd.DataFrame(sweep), hide_index=True)
+
+    if lda_topics:
+        st.markdown("### 📝 Topic Coherence Check")
+        for topic in lda_topics:
+            words = topic['words'].split(", ")
+            if any(words.count(word) > 1 for word in words):
+                st.warning(f"⚠ Topic '{topic['topic']}' may have low coherence: repeated words.")
+            st.markdown(f"**{topic['topic']}**: {topic['words']}")
+    else:
+        st.warning("⚠ Upload at least 2 documents for topic modeling.")
+
+    st.success("✔ Topic Modeling completed successfully!")
+
+    # TOPIC + SENTIMENT SUMMARY
+    st.markdown("## 🔗 Topic + Sentiment Summary")
+    st.markdown(f"<div class='reduce-card'>Overall Dataset Sentiment: <b>{corpus['overall_sentiment']}</b></div>", unsafe_allow_html=True)
+
+    # SENTIMENT DISTRIBUTION
+    distribution = corpus["sentiment_distribution"]
+    pos_count, neg_count, neu_count, total_docs = (distribution[k] for k in ("positive", "negative", "neutral", "total"))
+    st.markdown(f"<div class='reduce-card'>📊 Sentiment Distribution: Positive: {pos_count} ({round(pos_count/total_docs*100,1)}%), Neutral: {neu_count} ({round(neu_count/total_docs*100,1)}%), Negative: {neg_count} ({round(neg_count/total_docs*100,1)}%)</div>", unsafe_allow_html=True)
+
+    # SENTIMENT VS TOPICS VALIDATION
+    st.markdown("### 🔄 Sentiment vs Topics Validation")
+    conflicts = corpus["sentiment_conflicts"]
+    if len(conflicts) <= 5:
+        for name in conflicts:
+            st.info(f"ℹ Check document '{name}': Sentiment may conflict with topic keywords.")
+    else:
+        st.info(f"ℹ {len(conflicts):,} documents have a sentiment that may conflict with topic keywords.")
+        st.dataframe(pd.DataFrame({"document": conflicts[:ROW_PREVIEW]}), hide_index=True)
+        if len(conflicts) > ROW_PREVIEW:
+            st.caption(f"First {ROW_PREVIEW:,} of {len(conflicts):,} documents.")
+
+    # SENTIMENT PER TOPIC VISUALIZATION
+    topic_sent = corpus["topic_sentiments"]
+
+    if topic_sent:
+        df_topic_sent = pd.DataFrame(topic_sent)
+        st.bar_chart(df_topic_sent.set_index("topic"))
+
+    #INSIGHTS & SUMMARIZATION
+    st.markdown("## 🧾Automatic Summarization & Insights")
+
+    #Extractive Summary
+    st.markdown("### ✂ Extractive Summary")
+    st.markdown(f"<div class='text-box'>{corpus['extractive']}</div>", unsafe_allow_html=True)
+
+    #Abstractive Summary
+    st.markdown("### 🧠 Abstractive Summary")
+    if corpus["abstractive"].startswith("ERROR:"):
+        st.warning("⚠ Abstractive summarization failed due to model limitations.")
+    else:
+        st.markdown(f"<div class='text-box'>{corpus['abstractive']}</div>", unsafe_allow_html=True)
+        latency = summarizer_latency()
+        st.caption(f"Model load: {latency['load_seconds']}s · cold call avg: {latency['cold_avg_seconds']}s · warm call avg: {latency['warm_avg_seconds']}s")
+
+    #Insights Generation
+    st.markdown("### 💡 Generated Insights")
+    for insight in corpus["insights"]:
+        st.markdown(f"✔ {insight}")
+
+
+    #VISUALIZATION DASHBOARD
+
+    st.markdown("## 📊 Visualization Dashboard")
+
+    #WORD CLOUD
+    st.markdown("### ☁ Word Cloud")
+    if results["wordcloud_png"]:
+        st.image(results["wordcloud_png"])
+    else:
+        st.warning("No text available for Word Cloud.")
+
+    #SENTIMENT DISTRIBUTION
+    st.markdown("### 📈 Sentiment Distribution Chart")
+    show_sentiment_chart(download_list)
+
 
 def render_ui():
 
@@ -24,6 +259,29 @@ def render_ui():
     if "abstractive" not in st.session_state:
         st.session_state.abstractive = ""
 
+    #report inputs kept per session (the PDF itself is built in memory)
+    if "wordcloud_png" not in st.session_state:
+        st.session_state.wordcloud_png = None
+
+    if "sentiment_counts" not in st.session_state:
+        st.session_state.sentiment_counts = None
+
+    if "report_pdf" not in st.session_state:
+        st.session_state.report_pdf = None
+
+    if "perf" not in st.session_state:
+        st.session_state.perf = None
+
+    #background analysis of this session (see jobs.py)
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    if "job_id" not in st.session_state:
+        st.session_state.job_id = None
+
+    if "shown_job" not in st.session_state:
+        st.session_state.shown_job = None
+
     # PAGE SETUP
     st.set_page_config(page_title="NarrativeNexus", layout="wide")
     st.markdown(load_css(), unsafe_allow_html=True)
@@ -31,250 +289,166 @@ def render_ui():
     st.markdown("<h1 class='page-title'>📘 NarrativeNexus</h1>", unsafe_allow_html=True)
     st.markdown("<h3 class='page-subtitle'>Dynamic Text Analysis Platform</h3>", unsafe_allow_html=True)
 
-    # FILE UPLOAD
-    st.markdown("<div class='card-section'>", unsafe_allow_html=True)
-    st.markdown("<h4 class='section-title'>📥 Upload Your Files</h4>", unsafe_allow_html=True)
-    uploaded_files = st.file_uploader("", type=["txt", "pdf", "docx", "csv"], accept_multiple_files=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # DIRECT INPUT
-    st.markdown("<div class='card-section'>", unsafe_allow_html=True)
-    st.markdown("<h4 class='section-title'>✍ Paste Text Directly</h4>", unsafe_allow_html=True)
-    direct_text = st.text_area("", height=180)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # PROCESS BUTTON
-    st.markdown("<div class='card-section center'>", unsafe_allow_html=True)
-
-    if st.button("🚀Analyze Text", use_container_width=True):
-
-        all_inputs = []
-
-        # Uploaded Files
-        if uploaded_files:
-            for file in uploaded_files:
-                details = get_file_details(file)
-                text = extract_text(file)
-                all_inputs.append((details, text))
-
-        # Direct Text
-        if direct_text.strip():
-            all_inputs.append((
-                {"name": "Direct Input", "type": "text/plain",
-                 "size_kb": round(len(direct_text) / 1024, 2), "extension": "txt"},
-                direct_text
-            ))
-
-        if not all_inputs:
-            st.error("❌ No valid input provided.")
-            st.markdown("</div>", unsafe_allow_html=True)
-            return
+    # MODEL MEMORY (shared by all sessions of this server)
+    with st.sidebar.expander("🧠 Summarization Model"):
+        colW, colU = st.columns(2)
+        if colW.button("Warm up"):
+            warm_up_summarizer()
+        if colU.button("Unload"):
+            unload_summarizer()
+        st.json(summarizer_latency())
+
+    workers = st.sidebar.number_input("⚙ Worker processes (1 = serial)", min_value=1, max_value=64, value=DEFAULT_WORKERS)
+
+    # INCREMENTAL TOPIC MODEL (saved between sessions, new documents update it)
+    incremental_topics = st.sidebar.checkbox("🧠 Incremental topic model")
+    if incremental_topics and st.sidebar.button("Reset topic model"):
+        reset_topic_state()
+
+    dedup = st.sidebar.checkbox("🧬 Model near-duplicate documents once", value=DEDUP)
+
+    num_topics = st.sidebar.selectbox("🔢 Number of topics", ["auto"] + list(range(2, 11)), index=4)
+
+    summary_method = st.sidebar.selectbox("✂ Extractive summary method", ["frequency", "tfidf", "textrank"])
+
+    # RESULT CACHE
+    cache = get_cache()
+    with st.sidebar.expander("🗄 Result Cache"):
+        if st.button("Clear cache"):
+            cache.clear()
+        st.json(cache.stats())
+
+    # PERFORMANCE (stage timings of the last run that did any work)
+    perf_panel = st.sidebar.expander("⏱ Performance")
+    if not perf.MEMORY:
+        perf_panel.caption("Peak memory is off (start the server with NN_PERF_MEMORY=1).")
+    recording = perf.start()
+    #the recording is stopped however the run ends (early return, st.stop, rerun)
+    try:
+        # FILE UPLOAD
+        st.markdown("<div class='card-section'>", unsafe_allow_html=True)
+        st.markdown("<h4 class='section-title'>📥 Upload Your Files</h4>", unsafe_allow_html=True)
+        uploaded_files = st.file_uploader("", type=["txt", "pdf", "docx", "csv"], accept_multiple_files=True)
+
+        # CSV ROWS AS DOCUMENTS (only the chosen columns are read)
+        csv_rows = {}
+        csv_files = [file for file in uploaded_files or [] if file.name.lower().endswith(".csv")]
+        if csv_files and st.checkbox("📑 Treat each CSV row as a document"):
+            for file in csv_files:
+                try:
+                    columns = csv_columns(file)
+                except Exception as e:
+                    st.warning(f"⚠ Could not read the header of {file.name}: {e}")
+                    continue
+                colT, colI = st.columns(2)
+                text_column = colT.selectbox(f"Text column of {file.name}", columns, key=f"csv_text_{file.name}")
+                id_column = colI.selectbox(
+                    "ID / timestamp column", [None] + columns, key=f"csv_id_{file.name}",
+                    format_func=lambda column: "(row number)" if column is None else column
+                )
+                csv_rows[file.name] = {"text_column": text_column, "id_column": id_column}
+        st.markdown("</div>", unsafe_allow_html=True)
 
+        # DIRECT INPUT
+        st.markdown("<div class='card-section'>", unsafe_allow_html=True)
+        st.markdown("<h4 class='section-title'>✍ Paste Text Directly</h4>", unsafe_allow_html=True)
+        direct_text = st.text_area("", height=180)
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # DISPLAY ANALYSIS
-        download_list = []
-
-        for details, text in all_inputs:
-
-            # File title card
-            st.markdown(f"<div class='file-title'>📄 {details['name']}</div>", unsafe_allow_html=True)
-
-            with st.container():
-                colA, colB, colC = st.columns([1.5, 1, 1])
-                colA.markdown("**File Type:** " + details['type'])
-                colB.markdown(f"**Size:** {details['size_kb']} KB")
-                colC.markdown("**Extension:** " + details['extension'])
-
-            # Preprocessing
-            result = preprocess_text(text)
-
-            # Statistics
-            st.markdown("<h3 class='section-title'>📊 Text Statistics</h3>", unsafe_allow_html=True)
-            col1, col2, col3, col4 = st.columns(4)
-            col1.markdown(f"<div class='stat-card blue'><div class='stat-number'>{result['original_words']}</div><div class='stat-label'>Original Words</div></div>", unsafe_allow_html=True)
-            col2.markdown(f"<div class='stat-card purple'><div class='stat-number'>{result['original_chars']}</div><div class='stat-label'>Original Characters</div></div>", unsafe_allow_html=True)
-            col3.markdown(f"<div class='stat-card blue'><div class='stat-number'>{result['cleaned_words']}</div><div class='stat-label'>Cleaned Words</div></div>", unsafe_allow_html=True)
-            col4.markdown(f"<div class='stat-card purple'><div class='stat-number'>{result['cleaned_chars']}</div><div class='stat-label'>Cleaned Characters</div></div>", unsafe_allow_html=True)
-
-            # Reduction Stats
-            st.markdown("<br>", unsafe_allow_html=True)
-            colr1, colr2 = st.columns(2)
-            colr1.markdown(f"<div class='reduce-card'>Word Reduction: {result['word_reduction']}%</div>", unsafe_allow_html=True)
-            colr2.markdown(f"<div class='reduce-card'>Character Reduction: {result['char_reduction']}%</div>", unsafe_allow_html=True)
-
-            # Text Comparison
-            st.markdown("<h3 class='section-title'>🔍 Text Comparison</h3>", unsafe_allow_html=True)
-            colA, colB = st.columns(2)
-            colA.markdown("<div class='text-box-title'>⛔ Original Text</div>", unsafe_allow_html=True)
-            colA.markdown(f"<div class='text-box'>{result['original_text']}</div>", unsafe_allow_html=True)
-            colB.markdown("<div class='text-box-title'>✔ Cleaned Text</div>", unsafe_allow_html=True)
-            colB.markdown(f"<div class='text-box'>{result['processed_text']}</div>", unsafe_allow_html=True)
-
-            # SENTIMENT ANALYSIS
-            sentiment_result = analyze_sentiment(result["processed_text"])
-            st.markdown("<h3 class='section-title'>😊 Sentiment Analysis</h3>", unsafe_allow_html=True)
-            colS1, colS2, colS3, colS4 = st.columns(4)
-            colS1.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiment_result['positive']}</div><div class='stat-label'>Positive</div></div>", unsafe_allow_html=True)
-            colS2.markdown(f"<div class='stat-card purple'><div class='stat-number'>{sentiment_result['neutral']}</div><div class='stat-label'>Neutral</div></div>", unsafe_allow_html=True)
-            colS3.markdown(f"<div class='stat-card blue'><div class='stat-number'>{sentiment_result['negative']}</div><div class='stat-label'>Negative</div></div>", unsafe_allow_html=True)
-            colS4.markdown(f"<div class='stat-card purple'><div class='stat-number'>{sentiment_result['compound']}</div><div class='stat-label'>Compound Score</div></div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='reduce-card'>Overall Sentiment: <b>{sentiment_result['sentiment']}</b></div>", unsafe_allow_html=True)
-            
-            if abs(sentiment_result["compound"]) < 0.05:
-                st.info("ℹ Sentiment confidence is low (near neutral).")
-
-            # STORE FOR CSV + LDA
-            download_list.append({
-                "name": details['name'],
-                "cleaned_text": result["processed_text"],
-                "sentiment": sentiment_result["sentiment"],
-                "compound_score": sentiment_result["compound"]
-            })
-
-        if not download_list:
-            st.warning("No data available for sentiment summary.")
-            return
-
-        # DOWNLOAD CSV
-        df = pd.DataFrame(download_list)
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(label="💾 Download Cleaned Text CSV", data=csv, file_name="cleaned_output.csv", mime="text/csv", use_container_width=True)
-        st.success("✔ Analysis Completed successfully!")
-
-        # LDA TOPIC MODELING
-        st.markdown("## 🧠 Topic Modeling (LDA)")
-        processed_texts = [item["cleaned_text"] for item in download_list if item.get("cleaned_text")]
-
-        if len(processed_texts) >= 2:
-            lda_topics = lda_topic_model(processed_texts, num_topics=5)
-
-            st.session_state.lda_topics = lda_topics
-
-            st.markdown("### 📝 Topic Coherence Check")
-            for topic in lda_topics:
-                words = topic['words'].split(", ")
-                if any(words.count(word) > 1 for word in words):
-                    st.warning(f"⚠ Topic '{topic['topic']}' may have low coherence: repeated words.")
-                st.markdown(f"**{topic['topic']}**: {topic['words']}")
-        else:
-            st.warning("⚠ Upload at least 2 documents for topic modeling.")
-
-        st.success("✔ Topic Modeling completed successfully!")
-
-        # TOPIC + SENTIMENT SUMMARY
-        st.markdown("## 🔗 Topic + Sentiment Summary")
-        avg_sentiment = sum(item["compound_score"] for item in download_list) / len(download_list)
-        st.session_state.overall_sentiment = (
-            "Positive 😊" if avg_sentiment >= 0.05 else
-            "Negative 😠" if avg_sentiment <= -0.05 else
-            "Neutral 😐"
-        )
-        st.markdown(f"<div class='reduce-card'>Overall Dataset Sentiment: <b>{st.session_state.overall_sentiment}</b></div>", unsafe_allow_html=True)
-
-        # SENTIMENT DISTRIBUTION
-        pos_count = sum(1 for item in download_list if item["compound_score"] > 0.05)
-        neg_count = sum(1 for item in download_list if item["compound_score"] < -0.05)
-        neu_count = sum(1 for item in download_list if -0.05 <= item["compound_score"] <= 0.05)
-        total_docs = len(download_list)
-        st.markdown(f"<div class='reduce-card'>📊 Sentiment Distribution: Positive: {pos_count} ({round(pos_count/total_docs*100,1)}%), Neutral: {neu_count} ({round(neu_count/total_docs*100,1)}%), Negative: {neg_count} ({round(neg_count/total_docs*100,1)}%)</div>", unsafe_allow_html=True)
-
-        # SENTIMENT VS TOPICS VALIDATION
-        st.markdown("### 🔄 Sentiment vs Topics Validation")
-        for item in download_list:
-            text = item["cleaned_text"]
-            sentiment = item["sentiment"]
-            warning_flag = False
-            for topic in lda_topics if len(processed_texts) >= 2 else []:
-                for word in topic["words"].split(", "):
-                    if word.lower() in text.lower():
-                        if sentiment == "Positive 😊" and word.lower() in ["bad","problem","fail","error"]:
-                            warning_flag = True
-                        if sentiment == "Negative 😠" and word.lower() in ["good","success","win","happy"]:
-                            warning_flag = True
-            if warning_flag:
-                st.info(f"ℹ Check document '{item['name']}': Sentiment may conflict with topic keywords.")
-
-        # SENTIMENT PER TOPIC VISUALIZATION
-        topic_sentiments = []
-        for topic in lda_topics if len(processed_texts) >= 2 else []:
-            relevant_docs = [item["compound_score"] for item in download_list if any(word in item["cleaned_text"] for word in topic["words"].split(", "))]
-            avg_score = sum(relevant_docs)/len(relevant_docs) if relevant_docs else 0
-            topic_sentiments.append({"topic": topic["topic"], "avg_sentiment": avg_score})
-
-        if topic_sentiments:
-            df_topic_sent = pd.DataFrame(topic_sentiments)
-            st.bar_chart(df_topic_sent.set_index("topic"))
-
-        #INSIGHTS & SUMMARIZATION
-        st.markdown("## 🧾Automatic Summarization & Insights")
-        combined_text = " ".join(processed_texts)
-
-        #Extractive Summary
-        st.markdown("### ✂ Extractive Summary")
-        extractive = extractive_summary(combined_text)
-        st.session_state.extractive = extractive
-        st.markdown(f"<div class='text-box'>{extractive}</div>", unsafe_allow_html=True)
-
-        #Abstractive Summary
-        st.markdown("### 🧠 Abstractive Summary")
-        try:
-            abstractive = abstractive_summary(combined_text[:1000])
-            st.session_state.abstractive = abstractive
-            st.markdown(f"<div class='text-box'>{abstractive}</div>", unsafe_allow_html=True)
-        except Exception:
-            st.warning("⚠ Abstractive summarization failed due to model limitations.")
-
-        #Insights Generation
-        st.markdown("### 💡 Generated Insights")
-        insights = generate_insights(lda_topics, st.session_state.overall_sentiment)
-
-        for insight in insights:
-            st.markdown(f"✔ {insight}")
-
-        
-        #VISUALIZATION DASHBOARD
-
-        st.markdown("## 📊 Visualization Dashboard")
-
-        #WORD CLOUD
-        st.markdown("### ☁ Word Cloud")
-        show_wordcloud(combined_text)
-
-        #SENTIMENT DISTRIBUTION
-        st.markdown("### 📈 Sentiment Distribution Chart")
-        show_sentiment_chart(download_list)
-
-    #REPORT GENERATION
-    import os
-
-    st.markdown("## 📄 Generate Analysis Report")
-
-    report_file = "NarrativeNexus_Report.pdf"
-
-    if st.button("📥 Generate PDF Report"):
-
-        if st.session_state.overall_sentiment is None:
-            st.error("❌ Please analyze text before generating the report.")
-        else:
-            generate_pdf_report(
-                report_file,
-                st.session_state.overall_sentiment,
-                st.session_state.lda_topics,
-                st.session_state.extractive,
-                st.session_state.abstractive
+        # PROCESS BUTTON
+        st.markdown("<div class='card-section center'>", unsafe_allow_html=True)
+        jobs = get_jobs()
+
+        if st.button("🚀Analyze Text", use_container_width=True):
+
+            all_inputs = []
+
+            # Uploaded Files
+            if uploaded_files:
+                for file in uploaded_files:
+                    details = get_file_details(file)
+                    if file.name in csv_rows:
+                        details["csv_rows"] = csv_rows[file.name]
+                    all_inputs.append((details, UploadedBytes.from_upload(file)))
+
+            # Direct Text
+            if direct_text.strip():
+                all_inputs.append((
+                    {"name": "Direct Input", "type": "text/plain",
+                     "size_kb": round(len(direct_text) / 1024, 2), "extension": "txt"},
+                    direct_text
+                ))
+
+            if not all_inputs:
+                st.error("❌ No valid input provided.")
+                st.markdown("</div>", unsafe_allow_html=True)
+                return
+
+            #runs as a background job: reruns (any widget change) reattach to it
+            job = jobs.submit(
+                st.session_state.session_id, "analysis", analyze_inputs, all_inputs,
+                stages=ANALYSIS_STAGES, workers=int(workers), cache=cache, num_topics=num_topics,
+                summary_method=summary_method, incremental=incremental_topics, dedup=dedup
             )
-            st.success("✔ Report generated successfully!")
+            st.session_state.job_id = job.id
+
+        st.markdown("</div>", unsafe_allow_html=True)
 
-    #Show download button ONLY if file exists
-    if os.path.exists(report_file):
-        with open(report_file, "rb") as f:
+        # ANALYSIS JOB
+        job = jobs.get(st.session_state.job_id) if st.session_state.job_id else None
+        if job is not None and not job.done:
+            _job_progress(job.id)
+        elif job is not None and job.status == "failed":
+            st.error(f"❌ Analysis failed: {job.error}")
+        elif job is not None and job.status == "cancelled":
+            st.info("ℹ Analysis cancelled.")
+        elif job is not None:
+            if st.session_state.shown_job != job.id:
+                _store_results(job)
+            _render_results(job.result)
+
+        #REPORT GENERATION
+        st.markdown("## 📄 Generate Analysis Report")
+
+        include_charts = st.checkbox("Include word cloud and sentiment chart", value=True)
+
+        if st.button("📥 Generate PDF Report"):
+
+            if st.session_state.overall_sentiment is None:
+                st.error("❌ Please analyze text before generating the report.")
+            else:
+                st.session_state.report_pdf = build_pdf_report(
+                    st.session_state.overall_sentiment,
+                    st.session_state.lda_topics,
+                    st.session_state.extractive,
+                    st.session_state.abstractive,
+                    wordcloud_png=st.session_state.wordcloud_png if include_charts else None,
+                    sentiment_counts=st.session_state.sentiment_counts if include_charts else None
+                )
+                st.success("✔ Report generated successfully!")
+
+        #Show download button ONLY once this session has a report
+        if st.session_state.report_pdf is not None:
             st.download_button(
                 label="⬇ Download Report",
-                data=f,
-                file_name=report_file,
+                data=st.session_state.report_pdf,
+                file_name="NarrativeNexus_Report.pdf",
                 mime="application/pdf"
             )
+    finally:
+        perf.stop()
+
+    #PERFORMANCE PANEL
+    if recording.spans:
+        st.session_state.perf = recording
+        perf.export(recording)
+
+    if st.session_state.perf is not None:
+        with perf_panel:
+            st.dataframe(pd.DataFrame(perf.summary(st.session_state.perf.spans)), hide_index=True)
+            colJ, colP = st.columns(2)
+            colJ.download_button("JSON", perf.to_json(st.session_state.perf), file_name="perf.json", mime="application/json")
+            colP.download_button("Prometheus", perf.to_prometheus(st.session_state.perf), file_name="perf.prom", mime="text/plain")
 
 
 
@@ -1,48 +1,286 @@
-from collections import Counter
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from transformers import pipeline
-
-# Download tokenizer once
-nltk.download("punkt")
+import os
+import time
+import numpy as np
+import model_registry
+import perf
+import resources
 
 #EXTRACTIVE SUMMARIZATION
-def extractive_summary(text, num_sentences=3):
+# All sentences go into one sparse sentence x term matrix and are scored with
+# matrix products instead of re-tokenizing each sentence in Python.
+#   frequency: sum of corpus frequencies of the sentence's words
+#   tfidf:     similarity of the sentence's tf-idf vector to the document centroid
+#   textrank:  PageRank over the sentence cosine-similarity graph
+
+
+def _sentence_matrix(sentences, tfidf):
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+    vectorizer = CountVectorizer(
+        token_pattern=r"(?u)\b\w+\b",
+        stop_words="english" if tfidf else None,
+        dtype=np.float32
+    )
+    counts = vectorizer.fit_transform(sentences)
+    return TfidfTransformer().fit_transform(counts) if tfidf else counts
+
+
+def _textrank(X, damping=0.85, max_iter=100, tol=1e-6):
+    """
+    The similarity graph W = X @ X.T (minus self-loops) is never built:
+    W @ v is computed as X @ (X.T @ v) - diag * v, so memory and time per
+    iteration stay O(non-zeros of X) even for 100k+ sentences
+    """
+    n = X.shape[0]
+    XT = X.T.tocsr()
+    diag = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+    def graph_dot(v):
+        return X @ (XT @ v) - diag * v
+
+    out = graph_dot(np.ones(n))
+    dangling = out <= 1e-12
+    out[dangling] = 1
+
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        updated = graph_dot(scores / out)
+        updated[dangling] = 0
+        updated = (1 - damping) / n + damping * (updated + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def score_sentences(sentences, method="frequency"):
+    """
+    One score per sentence (numpy array), see the methods above
+    """
+    try:
+        X = _sentence_matrix(sentences, tfidf=method != "frequency")
+    except ValueError:  # no usable words at all
+        return np.zeros(len(sentences))
+
+    if method == "frequency":
+        freq = np.asarray(X.sum(axis=0)).ravel()
+        return X @ freq
+    if method == "tfidf":
+        centroid = np.asarray(X.mean(axis=0)).ravel()
+        return X @ centroid
+    if method == "textrank":
+        return _textrank(X)
+    raise ValueError(f"Unknown extractive method: {method}")
+
+
+@perf.timed()
+def extractive_summary(text, num_sentences=3, method="frequency"):
     if not text or len(text.split()) < 20:
         return "Text too short for extractive summarization."
 
-    sentences = sent_tokenize(text)
-    words = word_tokenize(text.lower())
-
-    freq = Counter(words)
+    resources.require("punkt")
+    from nltk.tokenize import sent_tokenize
 
-    sentence_scores = {}
-    for sent in sentences:
-        for word in word_tokenize(sent.lower()):
-            if word in freq:
-                sentence_scores[sent] = sentence_scores.get(sent, 0) + freq[word]
+    sentences = sent_tokenize(text)
+    scores = score_sentences(sentences, method)
 
-    ranked_sentences = sorted(sentence_scores, key=sentence_scores.get, reverse=True)
+    #best sentences first, skipping repeats; returned in original order
+    chosen = []
+    seen = set()
+    for i in np.argsort(-scores, kind="stable"):
+        if sentences[i] in seen:
+            continue
+        seen.add(sentences[i])
+        chosen.append(i)
+        if len(chosen) == num_sentences:
+            break
 
-    summary = " ".join(ranked_sentences[:num_sentences])
+    summary = " ".join(sentences[i] for i in sorted(chosen))
     return summary
 
 
 #ABSTRACTIVE SUMMARIZATION
-def abstractive_summary(text):
-    if not text or len(text.split()) < 50:
-        return "Text too short for abstractive summarization."
+# On CPU the model's Linear layers are quantized to int8 after loading
+# (dynamic quantization: int8 weights, activations quantized per call),
+# which cuts memory and latency of BART-sized models. NN_SUMMARIZER_MODEL
+# picks another checkpoint, e.g. the smaller sshleifer/distilbart-cnn-6-6 or
+# a local directory; NN_SUMMARIZER_QUANTIZE=0 keeps float weights.
+# Texts longer than the model input are summarized map-reduce style (see
+# map_reduce_summary) instead of being cut off.
+SUMMARIZER = "summarizer"
+SUMMARIZER_MODEL = os.environ.get("NN_SUMMARIZER_MODEL", "facebook/bart-large-cnn")
+QUANTIZE = os.environ.get("NN_SUMMARIZER_QUANTIZE", "1") != "0"
 
+CHUNK_TOKENS = 900          #BART reads at most 1024 tokens
+MAX_CHUNKS = int(os.environ.get("NN_SUMMARY_MAX_CHUNKS", "32"))   #longer texts: evenly spaced chunks
+MAX_ROUNDS = 4
+MAP_LENGTH = (30, 100)      #(min, max) tokens of a chunk summary
+FINAL_LENGTH = (40, 130)
+
+
+def _quantize(model):
+    import torch
+    if next(model.parameters()).device.type != "cpu":
+        return model
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_summarizer():
+    # transformers pulls in torch: import it only when the model is needed
+    from transformers import pipeline
     summarizer = pipeline(
         "summarization",
-        model="facebook/bart-large-cnn"
+        model=SUMMARIZER_MODEL
     )
+    if QUANTIZE:
+        summarizer.model = _quantize(summarizer.model)
+    return summarizer
+
+model_registry.register(SUMMARIZER, _load_summarizer)
+
 
-    result = summarizer(
-        text,
-        max_length=130,
-        min_length=40,
-        do_sample=False
+def warm_up_summarizer():
+    """
+    Load the summarization model before the first request (e.g. at server start)
+    """
+    model_registry.warm_up(SUMMARIZER)
+
+
+def unload_summarizer():
+    """
+    Free the summarization model; it is reloaded lazily on the next request
+    """
+    model_registry.unload(SUMMARIZER)
+
+
+def summarizer_latency():
+    return model_registry.latency_report(SUMMARIZER)
+
+
+def _token_counts(summarizer, texts):
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    if tokenizer is None:
+        return [len(text.split()) for text in texts]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+def _summarize(texts, length, batch_size=8, cold=None, load_seconds=0.0):
+    """
+    One batched pipeline call. length: (min, max) summary tokens, lowered for
+    inputs shorter than that so short chunks are not padded with invented text.
+    cold: whether the call pays for loading the model (checked when None);
+    load_seconds: time the caller already spent loading it for this call
+    """
+    if cold is None:
+        cold = not model_registry.is_loaded(SUMMARIZER)
+    start = time.perf_counter()
+    summarizer = model_registry.get(SUMMARIZER)
+    counts = _token_counts(summarizer, texts)
+
+    results = summarizer(
+        texts,
+        max_length=max(min(length[1], max(counts)), 2),
+        min_length=max(min(length[0], min(counts) // 2), 1),
+        do_sample=False,
+        truncation=True,
+        batch_size=batch_size
     )
+    model_registry.record_call(SUMMARIZER, time.perf_counter() - start + load_seconds, cold)
+    return [result["summary_text"] for result in results]
+
+
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS):
+    """
+    Splits text at sentence boundaries into chunks of at most chunk_tokens
+    model tokens. A sentence longer than that (e.g. cleaned text without
+    punctuation) is cut into word windows.
+    """
+    resources.require("punkt")
+    from nltk.tokenize import sent_tokenize
+
+    sentences = sent_tokenize(text)
+    counts = _token_counts(model_registry.get(SUMMARIZER), sentences)
+
+    pieces = []
+    for sentence, count in zip(sentences, counts):
+        if count <= chunk_tokens:
+            pieces.append((sentence, count))
+            continue
+        words = sentence.split()
+        step = max(1, len(words) * chunk_tokens // count)
+        for i in range(0, len(words), step):
+            window = words[i:i + step]
+            pieces.append((" ".join(window), count * len(window) // len(words)))
+
+    chunks, current, size = [], [], 0
+    for piece, count in pieces:
+        if current and size + count > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += count
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+@perf.timed("abstractive_summary")
+def map_reduce_summary(text, chunk_tokens=CHUNK_TOKENS, max_chunks=MAX_CHUNKS, batch_size=8, progress=None):
+    """
+    Summary of a text of any length: the text is split into model-sized
+    chunks (chunk_text), the chunks are summarized in batches (map) and the
+    joined chunk summaries are chunked and summarized again (reduce) until
+    they fit one chunk. Only max_chunks evenly spaced chunks are read from
+    very long texts. progress(fraction) is called between batches.
+    """
+    if not text or len(text.split()) < 50:
+        return "Text too short for abstractive summarization."
+
+    #chunk_text needs the model's tokenizer: load it here, timed, and count
+    #the load towards the first call so the cold figure is load + inference
+    cold = not model_registry.is_loaded(SUMMARIZER)
+    start = time.perf_counter()
+    model_registry.get(SUMMARIZER)
+    load_seconds = time.perf_counter() - start if cold else 0.0
+    chunks = chunk_text(text, chunk_tokens)
+    if len(chunks) > max_chunks:
+        chunks = [chunks[i] for i in np.linspace(0, len(chunks) - 1, max_chunks).round().astype(int)]
+
+    #the first map round is most of the work
+    total, done = len(chunks) + 1, 0
+    for _ in range(MAX_ROUNDS):
+        if len(chunks) == 1:
+            break
+        summaries = []
+        for start in range(0, len(chunks), batch_size):
+            if progress is not None:
+                progress(min(done / total, 1.0))
+            batch = chunks[start:start + batch_size]
+            summaries.extend(_summarize(batch, MAP_LENGTH, batch_size, cold, load_seconds))
+            cold, load_seconds = False, 0.0
+            done += len(batch)
+        chunks = chunk_text(" ".join(summaries), chunk_tokens)
+
+    #still several chunks after MAX_ROUNDS: the final call truncates
+    return _summarize([" ".join(chunks)], FINAL_LENGTH, cold=cold, load_seconds=load_seconds)[0]
+
+
+@perf.timed("abstractive_summary")
+def abstractive_summaries(texts, batch_size=8):
+    """
+    Summarize many documents with one shared model, batched through the
+    pipeline (each document truncated to the model input)
+    """
+    summaries = ["Text too short for abstractive summarization."] * len(texts)
+    long_enough = [i for i, text in enumerate(texts) if text and len(text.split()) >= 50]
+    if not long_enough:
+        return summaries
+
+    results = _summarize([texts[i] for i in long_enough], FINAL_LENGTH, batch_size)
+    for i, summary in zip(long_enough, results):
+        summaries[i] = summary
+    return summaries
+
 
-    return result[0]["summary_text"]
+def abstractive_summary(text, progress=None):
+    return map_reduce_summary(text, progress=progress)
@@ -0,0 +1,126 @@
+import html
+import itertools
+import re
+
+import streamlit as st
+
+#TEXT PREVIEW
+# Documents are shown one page (PAGE_CHARS characters) at a time. The page is
+# cut out of the text on the server, so a rerun sends one page of HTML however
+# large the document is. Navigation (page, character offset, search matches)
+# reruns only the preview fragment, not the whole app.
+
+PAGE_CHARS = 5000
+MAX_MATCHES = 1000
+_SNAP = 50          #a page boundary moves at most this far to reach whitespace
+_SPACE = re.compile(r"\s")
+
+
+def page_count(text, page_chars=PAGE_CHARS):
+    return max(1, -(-len(text) // page_chars))
+
+
+def page_start(text, page, page_chars=PAGE_CHARS):
+    """
+    Offset where page (0-based) begins: page * page_chars, moved to the next
+    whitespace when there is one within _SNAP characters, so words stay whole
+    """
+    offset = min(page * page_chars, len(text))
+    if offset in (0, len(text)):
+        return offset
+    match = _SPACE.search(text, offset, offset + _SNAP)
+    return match.end() if match else offset
+
+
+def page_of(text, offset, page_chars=PAGE_CHARS):
+    """
+    0-based page containing the character offset
+    """
+    page = min(offset // page_chars, page_count(text, page_chars) - 1)
+    if page and offset < page_start(text, page, page_chars):
+        page -= 1
+    return page
+
+
+def find_matches(text, query, limit=MAX_MATCHES):
+    """
+    Offsets of the first limit case-insensitive matches of query
+    """
+    if not query:
+        return []
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    return [match.start() for match in itertools.islice(pattern.finditer(text), limit)]
+
+
+def _highlight(window, query):
+    """
+    window as HTML with the matches of query marked. Matches are found in
+    the raw text and each segment is escaped on its own, so a query never
+    matches inside an escaped entity (e.g. "amp" in "&amp;").
+    """
+    if not query:
+        return html.escape(window)
+    parts = []
+    end = 0
+    for match in re.finditer(re.escape(query), window, re.IGNORECASE):
+        parts.append(html.escape(window[end:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        end = match.end()
+    parts.append(html.escape(window[end:]))
+    return "".join(parts)
+
+
+#navigation callbacks: they run before the rerun, so they may set the page widget's state
+
+def _go_to_offset(text, key, page_chars):
+    st.session_state[f"{key}_page"] = page_of(text, st.session_state[f"{key}_offset"], page_chars) + 1
+
+
+def _go_to_match(text, key, page_chars):
+    matches = find_matches(text, st.session_state[f"{key}_query"])
+    if matches:
+        index = min(st.session_state.get(f"{key}_match", 1), len(matches)) - 1
+        st.session_state[f"{key}_page"] = page_of(text, matches[index], page_chars) + 1
+
+
+def _new_query(text, key, page_chars):
+    st.session_state[f"{key}_match"] = 1
+    _go_to_match(text, key, page_chars)
+
+
+@st.fragment
+def text_preview(text, key, page_chars=PAGE_CHARS):
+    """
+    Paged, searchable view of text in a text-box. key: unique per preview
+    """
+    pages = page_count(text, page_chars)
+    if pages == 1:
+        st.markdown(f"<div class='text-box'>{html.escape(text)}</div>", unsafe_allow_html=True)
+        return
+
+    #a page kept from a longer document that used the same key
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+
+    args = (text, key, page_chars)
+    colP, colO = st.columns(2)
+    page = colP.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, key=f"{key}_page")
+    colO.number_input(
+        "Go to character", min_value=0, max_value=len(text), value=0, step=page_chars,
+        key=f"{key}_offset", on_change=_go_to_offset, args=args
+    )
+
+    query = st.text_input("🔎 Search", key=f"{key}_query", on_change=_new_query, args=args)
+    matches = find_matches(text, query)
+    if query and matches:
+        more = "+" if len(matches) == MAX_MATCHES else ""
+        st.number_input(
+            f"Match (of {len(matches):,}{more})", min_value=1, max_value=len(matches),
+            key=f"{key}_match", on_change=_go_to_match, args=args
+        )
+    elif query:
+        st.caption("No matches.")
+
+    start, end = page_start(text, page - 1, page_chars), page_start(text, page, page_chars)
+    st.caption(f"Characters {start:,}–{end:,} of {len(text):,}")
+    st.markdown(f"<div class='text-box'>{_highlight(text[start:end], query)}</div>", unsafe_allow_html=True)
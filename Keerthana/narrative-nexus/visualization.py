@@ -1,24 +1,79 @@
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import threading
+from collections import Counter, OrderedDict
 import pandas as pd
 import streamlit as st
+import perf
 
-#WORD CLOUD 
-def show_wordcloud(text):
-    if not text.strip():
+#WORD CLOUD
+# Rendered from term frequencies (the text is already cleaned, so it is only
+# split once) straight to PNG bytes, with no matplotlib figure in between.
+# PNGs are kept in a small LRU cache keyed by a hash of the frequency table,
+# so reruns with the same documents don't render again.
+
+WORDCLOUD_MAX_WORDS = 200
+WORDCLOUD_CACHE_SIZE = 32
+
+_png_cache = OrderedDict()
+_png_lock = threading.Lock()
+
+
+def term_frequencies(text):
+    return Counter(text.split())
+
+
+def _frequency_key(top):
+    h = hashlib.sha1()
+    for word, count in top:
+        h.update(f"{word}\0{count}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def wordcloud_png(frequencies, width=400, height=200):
+    """
+    PNG bytes of the word cloud for a {word: count} table (cached)
+    """
+    #only the top words are drawn, so only they go into the key
+    top = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:WORDCLOUD_MAX_WORDS]
+    key = (_frequency_key(top), width, height)
+
+    with _png_lock:
+        if key in _png_cache:
+            _png_cache.move_to_end(key)
+            return _png_cache[key]
+
+    #imported here: wordcloud is slow to import
+    from wordcloud import WordCloud
+
+    image = WordCloud(
+        width=width,
+        height=height,
+        background_color="white",
+        max_words=WORDCLOUD_MAX_WORDS
+    ).generate_from_frequencies(dict(top)).to_image()
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    png = buf.getvalue()
+
+    with _png_lock:
+        _png_cache[key] = png
+        while len(_png_cache) > WORDCLOUD_CACHE_SIZE:
+            _png_cache.popitem(last=False)
+    return png
+
+
+@perf.timed("wordcloud")
+def show_wordcloud(text="", frequencies=None):
+    if frequencies is None:
+        frequencies = term_frequencies(text)
+    if not frequencies:
         st.warning("No text available for Word Cloud.")
-        return
-
-    wordcloud = WordCloud(
-        width=400,
-        height=200,
-        background_color="white"
-    ).generate(text)
-
-    fig, ax = plt.subplots()
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig)
+        return None
+
+    png = wordcloud_png(frequencies)
+    st.image(png)
+    return png
 
 
 #SENTIMENT DISTRIBUTION CHART
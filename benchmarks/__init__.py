@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the two apps in this repository.
+
+Run from the repository root, e.g. ``python -m benchmarks.sentiment``.
+"""
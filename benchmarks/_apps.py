@@ -0,0 +1,16 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NARRATIVE_NEXUS = os.path.join(ROOT, "Keerthana", "narrative-nexus")
+MIND_MESH = os.path.join(ROOT, "Bhargav")
+
+
+def use_app(path):
+    """
+    Put an app directory on sys.path so its flat modules can be imported.
+    Both apps have modules with the same names (app, reporting), so only
+    load one app's clashing modules per process.
+    """
+    if path not in sys.path:
+        sys.path.insert(0, path)
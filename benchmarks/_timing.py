@@ -0,0 +1,45 @@
+import gc
+import time
+import tracemalloc
+
+
+class StageRecorder:
+    """
+    Runs benchmark stages and collects one JSON-ready record per stage:
+    wall time, peak traced memory and throughput. Peak memory comes from a
+    second, tracemalloc-instrumented run so it does not inflate the timing.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+
+    def run(self, stage, fn, items=None, nbytes=None):
+        gc.collect()
+        try:
+            start = time.perf_counter()
+            value = fn()
+            wall = time.perf_counter() - start
+
+            peak_mb = None
+            if self.memory:
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    fn()
+                    peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+                finally:
+                    tracemalloc.stop()
+        except Exception as e:
+            self.records.append({"stage": stage, "error": f"{type(e).__name__}: {e}"})
+            return None
+
+        record = {"stage": stage, "wall_seconds": round(wall, 4), "peak_mb": peak_mb}
+        if items is not None:
+            record["items"] = items
+            record["items_per_sec"] = round(items / wall, 2) if wall else None
+        if nbytes is not None:
+            record["mb"] = round(nbytes / (1024 * 1024), 3)
+            record["mb_per_sec"] = round(nbytes / (1024 * 1024) / wall, 3) if wall else None
+        self.records.append(record)
+        return value
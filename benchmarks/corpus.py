@@ -0,0 +1,43 @@
+import random
+
+# Deterministic synthetic text: filler words plus a sprinkling of words that
+# VADER and the stopword lists know about, so every stage has real work to do.
+
+POSITIVE = ["good", "great", "happy", "success", "win", "love", "excellent", "nice", "improve", "best"]
+NEGATIVE = ["bad", "problem", "fail", "error", "sad", "hate", "poor", "worst", "delay", "crash"]
+STOPWORDS = ["the", "and", "of", "to", "in", "is", "it", "that", "was", "for", "on", "with", "as", "this"]
+
+
+def make_vocabulary(size=5000, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = set()
+    while len(vocab) < size:
+        vocab.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(vocab)
+
+
+def make_documents(n_docs=1000, words_per_doc=200, vocab_size=5000, seed=0, sentence_length=15):
+    """
+    List of n_docs synthetic documents of roughly words_per_doc words,
+    split into capitalised sentences ending with a full stop.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(vocab_size, seed)
+    docs = []
+    for _ in range(n_docs):
+        words = []
+        for _ in range(words_per_doc):
+            r = rng.random()
+            if r < 0.3:
+                words.append(rng.choice(STOPWORDS))
+            elif r < 0.35:
+                words.append(rng.choice(POSITIVE))
+            elif r < 0.39:
+                words.append(rng.choice(NEGATIVE))
+            else:
+                # Zipf-like: low indices are much more frequent
+                words.append(vocab[int(len(vocab) * rng.random() ** 3)])
+        sentences = [words[i:i + sentence_length] for i in range(0, len(words), sentence_length)]
+        docs.append(" ".join(" ".join(s).capitalize() + "." for s in sentences))
+    return docs
@@ -0,0 +1,87 @@
+import io
+
+import pandas as pd
+
+# Synthetic upload fixtures (TXT, PDF, DOCX, CSV) built in memory from a
+# generated corpus, wrapped like Streamlit's UploadedFile.
+
+MIME_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "csv": "text/csv"
+}
+
+
+class FakeUpload(io.BytesIO):
+    """
+    Minimal stand-in for streamlit's UploadedFile: name, type, read(), getvalue()
+    """
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.type = MIME_TYPES[name.rsplit(".", 1)[-1]]
+
+
+def make_txt(docs):
+    return "\n\n".join(docs).encode("utf-8")
+
+
+def make_pdf(docs, lines_per_page=50, chars_per_line=90):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    _, height = A4
+    y = height - 40
+    for doc in docs:
+        words = doc.split()
+        line = []
+        for word in words:
+            line.append(word)
+            if sum(len(w) + 1 for w in line) >= chars_per_line:
+                c.drawString(40, y, " ".join(line))
+                line = []
+                y -= 14
+                if y < 40:
+                    c.showPage()
+                    y = height - 40
+        if line:
+            c.drawString(40, y, " ".join(line))
+            y -= 14
+    c.save()
+    return buf.getvalue()
+
+
+def make_docx(docs):
+    from docx import Document
+
+    document = Document()
+    for doc in docs:
+        document.add_paragraph(doc)
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def make_csv(docs):
+    df = pd.DataFrame({
+        "id": range(len(docs)),
+        "score": [i % 5 for i in range(len(docs))],
+        "text": docs
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def make_fixtures(docs):
+    """
+    {extension: bytes} for every supported upload type, all holding the same docs
+    """
+    return {
+        "txt": make_txt(docs),
+        "pdf": make_pdf(docs),
+        "docx": make_docx(docs),
+        "csv": make_csv(docs)
+    }
@@ -0,0 +1,67 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks._apps import MIND_MESH, NARRATIVE_NEXUS
+
+# Start-up budget check, meant for CI: imports each app's modules in a fresh
+# interpreter with `python -X importtime`, and exits non-zero when
+#   * the app's own import time (streamlit itself excluded) exceeds the budget, or
+#   * a heavy library that must stay lazy is imported at start-up.
+#   python -m benchmarks.import_time --budget-ms 600
+
+APPS = {
+    "narrative-nexus": (NARRATIVE_NEXUS, ["streamlit_ui"]),
+    "mind-mesh": (MIND_MESH, ["preprocess", "topic_modeling", "sentiment_summary", "reporting", "result_cache"])
+}
+
+# must only be imported on first use
+LAZY_MODULES = ["transformers", "torch", "sklearn", "wordcloud", "matplotlib", "reportlab", "nltk"]
+
+
+def measure(app_dir, modules):
+    """
+    Returns (cumulative seconds for the app's modules, set of all imported module names)
+    """
+    code = "import streamlit\n" + "".join(f"import {m}\n" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=app_dir, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import failed in {app_dir}:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.rstrip()[1:]          # nested imports are indented further
+        imported.add(name.strip())
+        if name in modules:               # top-level entries only
+            total_us += int(cumulative)
+    return total_us / 1e6, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start-up import time budget check")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", 600)))
+    args = parser.parse_args(argv)
+
+    failed = False
+    for app, (app_dir, modules) in APPS.items():
+        seconds, imported = measure(app_dir, modules)
+        eager = sorted(m for m in LAZY_MODULES if m in imported)
+        ok = seconds * 1000 <= args.budget_ms and not eager
+        failed |= not ok
+        print(f"{app:16s} {seconds * 1000:8.1f} ms (budget {args.budget_ms:.0f} ms)"
+              + (f"  eager heavy imports: {', '.join(eager)}" if eager else "")
+              + ("" if ok else "  FAIL"))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from benchmarks._apps import MIND_MESH, use_app
+from benchmarks.fixtures import FakeUpload, make_fixtures
+
+# Stage-by-stage benchmark of the Mind Mesh Analyst pipeline (run via benchmarks.run)
+
+
+def run(docs, recorder, workdir, abstractive=False):
+    use_app(MIND_MESH)
+    from preprocess import extract_text_from_uploaded_file, preprocess_text, get_word_count, get_top_keywords
+    from topic_modeling import split_into_documents, train_topic_model
+    from sentiment_summary import analyze_sentiments, extractive_summary
+    from reporting import make_wordcloud_image, generate_insights_text, make_pdf_bytes
+
+    for ext, data in make_fixtures(docs).items():
+        recorder.run(
+            f"extract_text_from_uploaded_file[{ext}]",
+            lambda data=data, ext=ext: extract_text_from_uploaded_file(FakeUpload(data, f"bench.{ext}")),
+            items=len(docs), nbytes=len(data)
+        )
+
+    raw = "\n\n".join(docs)
+    processed = recorder.run("preprocess_text", lambda: preprocess_text(raw), nbytes=len(raw.encode("utf-8")))
+    if processed is None:
+        return
+
+    chunks = split_into_documents(processed)
+    results = {}
+    for algo in ("LDA", "NMF"):
+        results[algo] = recorder.run(
+            f"train_topic_model[{algo}]",
+            lambda algo=algo: train_topic_model(chunks, algorithm=algo, n_topics=5),
+            items=len(chunks)
+        )
+
+    sent_df = recorder.run("analyze_sentiments", lambda: analyze_sentiments(chunks), items=len(chunks))
+    summary = recorder.run("extractive_summary", lambda: extractive_summary(raw), nbytes=len(raw))
+    recorder.run("get_top_keywords", lambda: get_top_keywords(processed))
+    recorder.run("wordcloud", lambda: make_wordcloud_image(processed.split()))
+
+    insights = generate_insights_text(
+        get_word_count(raw), get_word_count(processed), "(topics)",
+        float(sent_df["compound"].mean()) if sent_df is not None else 0.0,
+        summary or ""
+    )
+    recorder.run("pdf_report", lambda: make_pdf_bytes(insights))
@@ -0,0 +1,57 @@
+import os
+
+from benchmarks._apps import NARRATIVE_NEXUS, use_app
+from benchmarks.fixtures import FakeUpload, make_fixtures
+
+# Stage-by-stage benchmark of the NarrativeNexus pipeline (run via benchmarks.run)
+
+
+def run(docs, recorder, workdir, abstractive=False):
+    use_app(NARRATIVE_NEXUS)
+    from collection import extract_text
+    from preprocessing import preprocess_text
+    from sentiment import analyze_sentiment
+    from model import lda_topic_model
+    from summarization import extractive_summary, abstractive_summary
+    from visualization import show_wordcloud
+    from reporting import generate_pdf_report
+
+    raw_bytes = sum(len(d.encode("utf-8")) for d in docs)
+
+    for ext, data in make_fixtures(docs).items():
+        recorder.run(
+            f"extract_text[{ext}]",
+            lambda data=data, ext=ext: extract_text(FakeUpload(data, f"bench.{ext}")),
+            items=len(docs), nbytes=len(data)
+        )
+
+    results = recorder.run(
+        "preprocess_text",
+        lambda: [preprocess_text(d) for d in docs],
+        items=len(docs), nbytes=raw_bytes
+    )
+    if results is None:
+        return
+    texts = [r.processed_text for r in results]
+
+    recorder.run("analyze_sentiment", lambda: [analyze_sentiment(t) for t in texts], items=len(texts))
+
+    topics = recorder.run("lda_topic_model", lambda: lda_topic_model(texts, num_topics=5), items=len(texts))
+
+    # raw text keeps its sentence boundaries, which the summarizer needs
+    combined = " ".join(docs)
+    extractive = recorder.run("extractive_summary", lambda: extractive_summary(combined), nbytes=len(combined))
+
+    abstract = "(not benchmarked)"
+    if abstractive:
+        abstract = recorder.run("abstractive_summary", lambda: abstractive_summary(combined), nbytes=len(combined))
+
+    recorder.run("wordcloud", lambda: show_wordcloud(" ".join(texts)))
+
+    recorder.run(
+        "pdf_report",
+        lambda: generate_pdf_report(
+            os.path.join(workdir, "NarrativeNexus_Report.pdf"),
+            "Positive 😊", topics or [], extractive or "", abstract or ""
+        )
+    )
@@ -0,0 +1,48 @@
+import argparse
+import time
+
+from benchmarks._apps import NARRATIVE_NEXUS, use_app
+from benchmarks.corpus import make_documents
+
+# Throughput of preprocessing.preprocess_text (fused fast path) against the
+# original clean_text -> word_tokenize -> lemmatize pipeline.
+#   python -m benchmarks.preprocessing --mb 5
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preprocessing throughput benchmark: fused fast path vs. original pipeline")
+    parser.add_argument("--mb", type=float, default=5.0, help="document size in MB")
+    parser.add_argument("--skip-reference", action="store_true")
+    args = parser.parse_args(argv)
+
+    use_app(NARRATIVE_NEXUS)
+    import preprocessing
+
+    words = int(args.mb * 1024 * 1024 / 7)   # ~7 bytes per synthetic word
+    text = make_documents(1, words)[0] + " I cannot stop, we're gonna WIN — naïve café!"
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    preprocessing._lemmatize.cache_clear()
+    start = time.perf_counter()
+    fast = preprocessing._process_tokens(text)
+    fast_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preprocessing._process_tokens(text)
+    warm_seconds = time.perf_counter() - start
+
+    print(f"document:          {size_mb:.2f} MB")
+    print(f"fast path (cold):  {size_mb / fast_seconds:.2f} MB/s")
+    print(f"fast path (warm):  {size_mb / warm_seconds:.2f} MB/s  (lemma cache filled)")
+
+    if not args.skip_reference:
+        start = time.perf_counter()
+        reference = preprocessing._process_tokens_nltk(text)
+        ref_seconds = time.perf_counter() - start
+        assert fast == reference, "fast path output differs from the NLTK pipeline"
+        print(f"NLTK pipeline:     {size_mb / ref_seconds:.2f} MB/s")
+        print(f"speed-up:          {ref_seconds / fast_seconds:.1f}x, identical tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks._timing import StageRecorder
+from benchmarks.corpus import make_documents
+
+# End-to-end benchmark suite. Every stage of each app is timed on a
+# deterministic synthetic corpus; results are written as JSON.
+#   python -m benchmarks.run --docs 200 --words 300 --out bench.json
+# Runs offline on CPU (NLTK data must be installed locally); abstractive
+# summarization is only included with --abstractive. Each app runs in its own
+# interpreter because both apps have top-level modules with the same names.
+
+APPS = ("narrative-nexus", "mind-mesh")
+
+
+def _run_app(app, args):
+    if app == "narrative-nexus":
+        from benchmarks import narrative_nexus as module
+    else:
+        from benchmarks import mind_mesh as module
+
+    docs = make_documents(args.docs, args.words, args.vocab, args.seed)
+    recorder = StageRecorder(memory=not args.no_memory)
+    with tempfile.TemporaryDirectory() as workdir:
+        module.run(docs, recorder, workdir, abstractive=args.abstractive)
+    return recorder.records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NarrativeNexus / Mind Mesh benchmark suite")
+    parser.add_argument("--app", choices=APPS + ("all",), default="all")
+    parser.add_argument("--docs", type=int, default=200, help="number of synthetic documents")
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--vocab", type=int, default=5000, help="vocabulary size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--abstractive", action="store_true", help="include BART (needs the model locally)")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    config = {k: getattr(args, k) for k in ("docs", "words", "vocab", "seed", "abstractive")}
+
+    if args.app == "all":
+        apps = {}
+        for app in APPS:
+            cmd = [sys.executable, "-m", "benchmarks.run", "--app", app] + _forwarded(argv)
+            proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)) or ".")
+            if proc.returncode != 0:
+                apps[app] = [{"stage": "*", "error": proc.stderr[-2000:]}]
+            else:
+                apps[app] = json.loads(proc.stdout)["apps"][app]
+    else:
+        apps = {args.app: _run_app(args.app, args)}
+
+    report = {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "apps": apps
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def _forwarded(argv):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    forwarded = []
+    skip = False
+    for i, arg in enumerate(argv):
+        if skip:
+            skip = False
+            continue
+        if arg in ("--app", "--out"):
+            skip = True
+            continue
+        if arg.startswith(("--app=", "--out=")):
+            continue
+        forwarded.append(arg)
+    return forwarded
+
+
+if __name__ == "__main__":
+    main()
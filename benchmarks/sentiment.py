@@ -0,0 +1,60 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks._apps import MIND_MESH, NARRATIVE_NEXUS, use_app
+from benchmarks.corpus import make_documents
+
+# Batched VADER scoring vs. the old per-document loop, for both apps.
+# --workers applies to Mind Mesh's analyze_sentiments; NarrativeNexus scores
+# each batch in one process (parallel.process_row_batches spreads batches).
+#   python -m benchmarks.sentiment --docs 10000 --workers 4
+
+
+def _rate(n, seconds):
+    return round(n / seconds, 1) if seconds else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched vs. per-document VADER sentiment benchmark")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    docs = make_documents(args.docs, args.words)
+
+    use_app(NARRATIVE_NEXUS)
+    use_app(MIND_MESH)
+    import sentiment
+    import sentiment_summary
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    # old paths: a fresh analyzer per call (Mind Mesh), one dict per document
+    start = time.perf_counter()
+    sia = SentimentIntensityAnalyzer()
+    loop_scores = [sia.polarity_scores(d) for d in docs]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = sentiment.analyze_sentiment_batch(docs)
+    nn_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = sentiment_summary.analyze_sentiments(docs, workers=args.workers)
+    mm_seconds = time.perf_counter() - start
+
+    reference = np.array([s["compound"] for s in loop_scores])
+    assert np.array_equal(batch["compound"], reference), "NarrativeNexus batch differs from VADER loop"
+    assert np.array_equal(df["compound"].to_numpy(), reference), "Mind Mesh batch differs from VADER loop"
+
+    print(f"documents:                {args.docs} x ~{args.words} words, workers={args.workers}")
+    print(f"per-document loop:        {_rate(args.docs, loop_seconds)} docs/sec")
+    print(f"analyze_sentiment_batch:  {_rate(args.docs, nn_seconds)} docs/sec")
+    print(f"analyze_sentiments:       {_rate(args.docs, mm_seconds)} docs/sec")
+    print("scores identical to the per-document VADER path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import io
+import os
+import random
+import time
+
+from benchmarks._apps import NARRATIVE_NEXUS, use_app
+
+# Abstractive summarization on CPU: the old path (first 1000 characters,
+# float model) against map-reduce over the whole corpus, each with float and
+# int8-quantized weights. Runs offline with a small local checkpoint (a hub
+# name already in the local cache, or a directory):
+#   python -m benchmarks.summarization --model sshleifer/distilbart-cnn-6-6
+# Quality, without reference summaries:
+#   coverage   share of the corpus' documents whose subject the summary names
+#   vs_float   unigram F1 of the int8 summary against the float one (same path)
+
+SUBJECTS = [
+    "battery", "shipping", "refund", "screen", "keyboard", "camera", "warranty", "printer",
+    "speaker", "charger", "router", "invoice", "subscription", "headphones", "delivery", "firmware"
+]
+TEMPLATES = [
+    "Customers wrote that the {s} {verb} after a few weeks of use.",
+    "The support team logged {n} new tickets about the {s} this month.",
+    "Several reviewers compared the {s} with last year's model and found it {adj}.",
+    "An engineer traced the {s} issue to a supplier change in the spring.",
+    "Sales of the {s} {trend} by {n} percent in the second quarter.",
+    "Managers plan to review the {s} again before the holiday season.",
+]
+VERBS = ["stopped working", "improved noticeably", "behaved unpredictably", "worked as promised"]
+ADJECTIVES = ["better", "worse", "about the same", "more reliable", "harder to use"]
+TRENDS = ["rose", "fell", "held steady"]
+
+
+def make_corpus(n_docs, sentences, seed=0):
+    """
+    n_docs short English reports, document i about SUBJECTS[i % len(SUBJECTS)]
+    """
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n_docs):
+        subject = SUBJECTS[i % len(SUBJECTS)]
+        docs.append(" ".join(
+            rng.choice(TEMPLATES).format(
+                s=subject, n=rng.randint(2, 90), verb=rng.choice(VERBS),
+                adj=rng.choice(ADJECTIVES), trend=rng.choice(TRENDS)
+            )
+            for _ in range(sentences)
+        ))
+    return docs
+
+
+def coverage(summary, docs):
+    subjects = {SUBJECTS[i % len(SUBJECTS)] for i in range(len(docs))}
+    words = set(summary.lower().replace(".", " ").replace(",", " ").split())
+    return round(len(subjects & words) / len(subjects), 3)
+
+
+def unigram_f1(candidate, reference):
+    a, b = candidate.lower().split(), reference.lower().split()
+    overlap = sum(min(a.count(w), b.count(w)) for w in set(a))
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(a), overlap / len(b)
+    return round(2 * precision * recall / (precision + recall), 3)
+
+
+def model_mb(model):
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / (1024 * 1024), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU abstractive summarization benchmark")
+    parser.add_argument("--model", default=os.environ.get("NN_SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-6-6"),
+                        help="checkpoint name (from the local cache) or directory")
+    parser.add_argument("--docs", type=int, default=16)
+    parser.add_argument("--sentences", type=int, default=12, help="sentences per document")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--online", action="store_true", help="allow downloading the model")
+    args = parser.parse_args(argv)
+
+    if not args.online:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["NN_SUMMARIZER_MODEL"] = args.model
+    use_app(NARRATIVE_NEXUS)
+    import model_registry
+    import summarization
+
+    docs = make_corpus(args.docs, args.sentences)
+    corpus = " ".join(docs)
+
+    paths = {
+        "truncated": lambda: summarization.abstractive_summaries([corpus[:1000]], args.batch_size)[0],
+        "map_reduce": lambda: summarization.map_reduce_summary(corpus, batch_size=args.batch_size)
+    }
+    results = {}
+    for quantize in (False, True):
+        summarization.QUANTIZE = quantize
+        model_registry.unload(summarization.SUMMARIZER)
+        start = time.perf_counter()
+        summarizer = model_registry.get(summarization.SUMMARIZER)
+        load = time.perf_counter() - start
+        weights = "int8" if quantize else "float"
+        print(f"{weights:6} model: {model_mb(summarizer.model)} MB, loaded in {load:.1f}s")
+
+        for path, run in paths.items():
+            run()   #warm-up: first generate call allocates caches
+            start = time.perf_counter()
+            summary = run()
+            results[path, weights] = (time.perf_counter() - start, summary)
+
+    words = len(corpus.split())
+    print(f"\ncorpus: {args.docs} documents, {words} words, model {args.model}")
+    print(f"{'path':12} {'weights':8} {'seconds':>8} {'coverage':>9} {'vs_float':>9}")
+    for (path, weights), (seconds, summary) in results.items():
+        vs_float = unigram_f1(summary, results[path, "float"][1]) if weights == "int8" else 1.0
+        print(f"{path:12} {weights:8} {seconds:8.2f} {coverage(summary, docs):9.3f} {vs_float:9.3f}")
+    for (path, weights), (_, summary) in results.items():
+        print(f"\n[{path}, {weights}] {summary}")
+
+
+if __name__ == "__main__":
+    main()